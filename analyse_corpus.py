@@ -0,0 +1,140 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Tuple
+
+from ndjson_writer import NDJSONWriter
+
+# Analyseur chargé une seule fois par processus worker
+_ANALYZER = None
+
+
+def load_surahs(quran_path: str) -> List[Dict[str, Any]]:
+    """Charger le corpus trié par numéro de sourate puis d'ayah"""
+    with open(quran_path, 'r', encoding='utf-8') as f:
+        surahs = json.load(f)
+    for surah in surahs:
+        surah['ayahs'] = sorted(surah['ayahs'], key=lambda ayah: ayah['numberInSurah'])
+    return sorted(surahs, key=lambda surah: surah['number'])
+
+
+def surah_size(surah: Dict[str, Any]) -> int:
+    """Nombre de caractères d'une sourate (coût approximatif de l'analyse)"""
+    return sum(len(ayah['text']) for ayah in surah['ayahs'])
+
+
+def balance_shards(surahs: List[Dict[str, Any]], shard_count: int) -> List[List[Dict[str, Any]]]:
+    """Répartir les sourates en lots de taille équilibrée (plus grande d'abord, lot le moins chargé)"""
+    shard_count = max(1, min(shard_count, len(surahs)))
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(shard_count)]
+    loads = [0] * shard_count
+
+    for surah in sorted(surahs, key=surah_size, reverse=True):
+        target = loads.index(min(loads))
+        shards[target].append(surah)
+        loads[target] += surah_size(surah)
+
+    return shards
+
+
+def _init_worker(trees_dir: str, backend: str):
+    """Charger les arbres une fois par worker"""
+    global _ANALYZER
+    from rule_tajwid import get_shared_analyzer
+    _ANALYZER = get_shared_analyzer(trees_dir, backend)
+
+
+def analyze_ayah(surah_number: int, ayah: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    """Analyser un ayah avec l'analyseur du worker"""
+    record = {'surah': surah_number, 'ayah': ayah['numberInSurah']}
+
+    if mode == "spans":
+        record['spans'] = [list(span) for span in _ANALYZER.iter_rule_spans(ayah['text'])]
+    else:
+        result = _ANALYZER.analyze_verse(ayah['text'])
+        record.update(result)
+
+    return record
+
+
+def _analyze_shard(shard: List[Dict[str, Any]], mode: str) -> Tuple[Dict[int, List[Dict]], int]:
+    """Analyser toutes les sourates d'un lot ; retourne les résultats par sourate"""
+    results = {}
+    characters = 0
+    for surah in shard:
+        results[surah['number']] = [analyze_ayah(surah['number'], ayah, mode) for ayah in surah['ayahs']]
+        characters += surah_size(surah)
+    return results, characters
+
+
+def analyze_corpus(quran_path: str, output_path: str, workers: int = None, shards: int = None,
+                   trees_dir: str = "rule_trees", backend: str = "python", mode: str = "verse",
+                   compress: Optional[bool] = None) -> Dict[str, Any]:
+    """Analyser tout le corpus en parallèle et écrire un JSONL ordonné par sourate:ayah (gzip si '.gz')"""
+    surahs = load_surahs(quran_path)
+    workers = workers or os.cpu_count() or 1
+    shard_list = balance_shards(surahs, shards or workers * 2)
+    surah_order = [surah['number'] for surah in surahs]
+
+    started = time.perf_counter()
+    pending: Dict[int, List[Dict]] = {}
+    next_index, ayahs, characters = 0, 0, 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(trees_dir, backend)) as executor, \
+            NDJSONWriter(output_path, compress) as out:
+        futures = [executor.submit(_analyze_shard, shard, mode) for shard in shard_list]
+
+        for future in as_completed(futures):
+            results, shard_characters = future.result()
+            pending.update(results)
+            characters += shard_characters
+
+            # Écrire dès que les sourates suivantes dans l'ordre sont disponibles
+            while next_index < len(surah_order) and surah_order[next_index] in pending:
+                for record in pending.pop(surah_order[next_index]):
+                    out.write(record)
+                    ayahs += 1
+                next_index += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        'workers': workers,
+        'shards': len(shard_list),
+        'surahs': len(surah_order),
+        'ayahs': ayahs,
+        'characters': characters,
+        'seconds': elapsed,
+        'characters_per_second': characters / elapsed if elapsed > 0 else 0.0,
+        'ayahs_per_second': ayahs / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Annoter tout le corpus en parallèle (JSONL)")
+    parser.add_argument("--quran", default="quran-modified33.json")
+    parser.add_argument("--output", default="tajwid_corpus.jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut: nb de cœurs)")
+    parser.add_argument("--shards", type=int, default=None, help="Nombre de lots (défaut: 2 x workers)")
+    parser.add_argument("--trees-dir", default="rule_trees")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python")
+    parser.add_argument("--mode", choices=["verse", "spans"], default="verse",
+                        help="Résultat complet par ayah ou segments (règle, début, fin)")
+    parser.add_argument("--gzip", action="store_true", help="Compresser la sortie (implicite pour '.gz')")
+    args = parser.parse_args()
+
+    print(f"🕌 Analyse du corpus {args.quran} ...")
+    report = analyze_corpus(args.quran, args.output, args.workers, args.shards,
+                            args.trees_dir, args.backend, args.mode, args.gzip or None)
+
+    print(f"✅ {report['ayahs']} ayahs ({report['surahs']} sourates) écrits dans {args.output}")
+    print(f"   Workers: {report['workers']} | Lots: {report['shards']}")
+    print(f"   Durée: {report['seconds']:.1f} s | {report['characters_per_second']:.0f} caractères/s "
+          f"| {report['ayahs_per_second']:.1f} ayahs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from result_cache import content_version
+
+# Version du format stocké (à incrémenter si la sérialisation change)
+AUDIO_CACHE_VERSION = 1
+
+
+def audio_hash(audio_array: np.ndarray) -> str:
+    """Empreinte du contenu d'un clip (type, forme et échantillons)"""
+    digest = hashlib.sha256(f"{audio_array.dtype.str}{audio_array.shape}".encode('utf-8'))
+    digest.update(np.ascontiguousarray(audio_array).tobytes())
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """Cache sur disque des clips prétraités (16 kHz), adressé par contenu
+
+    La clé est le hash de (dataset, index de l'exemple ou hash du clip,
+    paramètres de prétraitement) : changer un paramètre produit d'autres
+    clés, seul ce qui a changé est recalculé. Chaque clip est un fichier
+    .npy ; un index SQLite garde sa taille et sa dernière utilisation.
+    Au-delà de ``max_bytes``, les clips les moins récemment utilisés sont
+    supprimés.
+    """
+
+    def __init__(self, directory: str = "audio_cache", max_bytes: int = 8 * 1024 ** 3):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes doit être positif")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS clips (key TEXT PRIMARY KEY, bytes INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(dataset: str, example_id: Any, params: Dict[str, Any]) -> str:
+        """Clé d'un clip : hash(version + dataset + identifiant + paramètres)"""
+        payload = f"{AUDIO_CACHE_VERSION}\0{dataset}\0{example_id}\0{content_version(params)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Clip en cache ou None (un fichier disparu compte comme un miss)"""
+        with self._lock:
+            row = self._connection.execute("SELECT bytes FROM clips WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                try:
+                    audio = np.load(self._path(key))
+                except (OSError, ValueError):
+                    self._connection.execute("DELETE FROM clips WHERE key = ?", (key,))
+                    self._connection.commit()
+                    row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._connection.execute("UPDATE clips SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return audio
+
+    def put(self, key: str, audio: np.ndarray):
+        """Enregistrer un clip puis évincer jusqu'à respecter max_bytes"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture atomique : un clip partiel n'est jamais lu
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            np.save(f, audio)
+        os.replace(temporary, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO clips (key, bytes, last_used) VALUES (?, ?, ?)",
+                (key, size, time.time())
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Supprimer les clips les moins récemment utilisés au-delà de max_bytes (verrou tenu)"""
+        total = self._connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM clips").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._connection.execute("SELECT key, bytes FROM clips ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._connection.execute("DELETE FROM clips WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Supprimer tous les clips"""
+        with self._lock:
+            for (key,) in self._connection.execute("SELECT key FROM clips").fetchall():
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._connection.execute("DELETE FROM clips")
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses, évictions et occupation du cache"""
+        with self._lock:
+            stored, total = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM clips"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'stored': stored,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,137 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from math import gcd
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import firwin, resample_poly
+
+ORIG_SR = 44100
+TARGET_SR = 16000
+
+# Version du prétraitement (à incrémenter si normalisation ou filtre changent)
+PREPROCESSING_VERSION = 1
+
+# Paramètres de resampling du worker courant
+_RESAMPLER: Optional[Tuple[int, int]] = None
+
+
+@lru_cache(maxsize=16)
+def polyphase_filter(orig_sr: int, target_sr: int) -> Tuple[int, int, np.ndarray]:
+    """(up, down, filtre FIR) pour une paire de fréquences, calculé une seule fois
+
+    Même filtre que ``resample_poly`` par défaut (fenêtre de Kaiser, beta 5,
+    10 périodes de part et d'autre) ; le tableau est en lecture seule.
+    """
+    divisor = gcd(orig_sr, target_sr)
+    up, down = target_sr // divisor, orig_sr // divisor
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    taps.setflags(write=False)
+    return up, down, taps
+
+
+def normalize_audio(audio_array: np.ndarray) -> np.ndarray:
+    """Convertir en float32 et ramener le pic à 1 (un clip silencieux reste à zéro)"""
+    audio_float = audio_array.astype(np.float32)
+    peak = np.max(np.abs(audio_float)) if audio_float.size else 0.0
+    if peak > 0:
+        audio_float /= peak
+    return audio_float
+
+
+def resample(audio: np.ndarray, orig_sr: int = ORIG_SR, target_sr: int = TARGET_SR) -> np.ndarray:
+    """Resampling polyphase avec le filtre mis en cache pour (orig_sr, target_sr)"""
+    if orig_sr == target_sr:
+        return audio
+    up, down, taps = polyphase_filter(orig_sr, target_sr)
+    return resample_poly(audio, up, down, window=taps).astype(np.float32, copy=False)
+
+
+def preprocess_audio(audio_array: np.ndarray, orig_sr: int = ORIG_SR, target_sr: int = TARGET_SR) -> np.ndarray:
+    """Normaliser puis resampler (float32, 16 kHz par défaut)"""
+    return resample(normalize_audio(audio_array), orig_sr, target_sr)
+
+
+def preprocessing_params(orig_sr: int = ORIG_SR, target_sr: int = TARGET_SR) -> Dict[str, Any]:
+    """Paramètres qui déterminent le résultat de preprocess_audio (clé de cache)"""
+    return {
+        'version': PREPROCESSING_VERSION,
+        'normalize': 'peak',
+        'resample': 'polyphase_kaiser5',
+        'orig_sr': orig_sr,
+        'target_sr': target_sr,
+    }
+
+
+def _init_worker(orig_sr: int, target_sr: int):
+    """Calculer le filtre une fois par worker"""
+    global _RESAMPLER
+    polyphase_filter(orig_sr, target_sr)
+    _RESAMPLER = (orig_sr, target_sr)
+
+
+def _preprocess_in_worker(audio_array: np.ndarray) -> np.ndarray:
+    return preprocess_audio(audio_array, *_RESAMPLER)
+
+
+class BatchResampler:
+    """Normalisation + resampling répartis sur un pool de processus
+
+    Les résultats sont rendus dans l'ordre des entrées. Avec ``workers=1``
+    tout est fait dans le processus courant (pas de pool).
+    """
+
+    def __init__(self, orig_sr: int = ORIG_SR, target_sr: int = TARGET_SR,
+                 workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.workers = workers or os.cpu_count() or 1
+        # Clips soumis mais pas encore rendus : borne la mémoire en mode flux
+        self.max_pending = max_pending or self.workers * 4
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.orig_sr, self.target_sr))
+        return self._executor
+
+    def params(self) -> Dict[str, Any]:
+        return preprocessing_params(self.orig_sr, self.target_sr)
+
+    def submit(self, audio_array: np.ndarray) -> Future:
+        """Prétraiter un clip en arrière-plan (calculé tout de suite avec ``workers=1``)"""
+        if self.workers > 1:
+            return self._pool().submit(_preprocess_in_worker, audio_array)
+        future = Future()
+        future.set_result(preprocess_audio(audio_array, self.orig_sr, self.target_sr))
+        return future
+
+    def iter_preprocessed(self, audio_arrays: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Clips prétraités au fil de l'eau, dans l'ordre, au plus ``max_pending`` en cours"""
+        pending = deque()
+        for audio_array in audio_arrays:
+            pending.append(self.submit(audio_array))
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def preprocess_batch(self, audio_arrays: List[np.ndarray]) -> List[np.ndarray]:
+        """Prétraiter une liste de clips (même ordre en sortie)"""
+        return list(self.iter_preprocessed(audio_arrays))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,180 @@
+import io
+import sys
+import json
+import time
+import resource
+import contextlib
+import multiprocessing
+from typing import Dict, List, Any, Optional
+
+# Analyseurs comparés : nom -> (module, classe, méthode d'analyse d'un verset, arguments)
+ANALYZERS = {
+    'complete': ('tajwid', 'CompleteTajweedAnalyzer', 'summarize', {}),
+    'enhanced': ('tajwid1', 'EnhancedTajweedAnalyzer', 'analyze_verse', {}),
+    'quran_trees': ('rule_tajwid', 'SimpleTajweedAnalyzer', 'analyze_verse', {}),
+    'quran_trees_numpy': ('rule_tajwid', 'SimpleTajweedAnalyzer', 'analyze_verse', {'backend': 'numpy'}),
+}
+
+# Sous-ensembles du corpus
+SUBSETS = ('short', 'long', 'full')
+
+# Métriques surveillées : nom -> sens de l'amélioration (+1 = plus grand est mieux)
+WATCHED_METRICS = {
+    'characters_per_second': +1,
+    'latency_p95_ms': -1,
+    'peak_rss_mb': -1,
+}
+
+
+def select_verses(quran_path: str, subset: str, long_count: int = 20,
+                  limit: Optional[int] = None) -> List[str]:
+    """Textes des ayahs d'un sous-ensemble du corpus"""
+    with open(quran_path, 'r', encoding='utf-8') as f:
+        surahs = json.load(f)
+
+    if subset == 'short':
+        # Sourates courtes : juz' 'Amma (78 à 114)
+        verses = [ayah['text'] for surah in surahs if surah['number'] >= 78 for ayah in surah['ayahs']]
+    elif subset == 'long':
+        verses = sorted((ayah['text'] for surah in surahs for ayah in surah['ayahs']),
+                        key=len, reverse=True)[:long_count]
+    elif subset == 'full':
+        verses = [ayah['text'] for surah in surahs for ayah in surah['ayahs']]
+    else:
+        raise ValueError(f"Sous-ensemble inconnu: {subset}")
+
+    return verses[:limit] if limit is not None else verses
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentile par interpolation linéaire"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * fraction
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (ru_maxrss en Ko sous Linux, en octets sous macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_benchmark(analyzer_name: str, verses: List[str]) -> Dict[str, Any]:
+    """Mesurer un analyseur (exécuté dans un processus neuf pour isoler la mémoire)"""
+    import importlib
+
+    module_name, class_name, method_name, kwargs = ANALYZERS[analyzer_name]
+
+    started = time.perf_counter()
+    analyzer_class = getattr(importlib.import_module(module_name), class_name)
+    analyzer = analyzer_class(**kwargs)
+    construction = time.perf_counter() - started
+
+    analyze = getattr(analyzer, method_name)
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for verse in verses:
+            started = time.perf_counter()
+            analyze(verse)
+            latencies.append(time.perf_counter() - started)
+
+    total = sum(latencies)
+    characters = sum(len(verse) for verse in verses)
+    return {
+        'ayahs': len(verses),
+        'characters': characters,
+        'construction_seconds': construction,
+        'total_seconds': total,
+        'characters_per_second': characters / total if total > 0 else 0.0,
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000,
+        'latency_p95_ms': percentile(latencies, 0.95) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+def run_benchmarks(quran_path: str, analyzers: List[str], subsets: List[str],
+                   long_count: int = 20, limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Lancer chaque couple (analyseur, sous-ensemble) dans son propre processus"""
+    context = multiprocessing.get_context("spawn")
+    results = {}
+
+    for subset in subsets:
+        verses = select_verses(quran_path, subset, long_count, limit)
+        for analyzer_name in analyzers:
+            with context.Pool(1) as pool:
+                results[f"{analyzer_name}/{subset}"] = pool.apply(_run_benchmark, (analyzer_name, verses))
+
+    return results
+
+
+def find_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                     threshold: float) -> List[str]:
+    """Comparer à une exécution précédente ; une dégradation > threshold est une régression"""
+    regressions = []
+    for key, metrics in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric, direction in WATCHED_METRICS.items():
+            old, new = previous.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            if change < -threshold:
+                regressions.append(f"{key} {metric}: {old:.2f} -> {new:.2f} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark des analyseurs Tajwid")
+    parser.add_argument("--quran", default="quran-modified33.json")
+    parser.add_argument("--analyzers", nargs="+", choices=list(ANALYZERS), default=list(ANALYZERS))
+    parser.add_argument("--subsets", nargs="+", choices=SUBSETS, default=['short', 'long'])
+    parser.add_argument("--long-count", type=int, default=20, help="Nombre d'ayahs les plus longs")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal d'ayahs par sous-ensemble")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Résultats JSON d'une exécution précédente")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Dégradation relative tolérée avant échec (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    # Lire la référence avant d'écrire les résultats : --output peut désigner le même fichier
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(args.quran, args.analyzers, args.subsets, args.long_count, args.limit)
+
+    print("=" * 100)
+    print(f"{'Analyseur/sous-ensemble':<32}{'car/s':>12}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'RSS Mo':>10}{'init s':>10}")
+    print("-" * 100)
+    for key, metrics in results.items():
+        print(f"{key:<32}{metrics['characters_per_second']:>12.0f}{metrics['latency_p50_ms']:>10.2f}"
+              f"{metrics['latency_p95_ms']:>10.2f}{metrics['latency_p99_ms']:>10.2f}"
+              f"{metrics['peak_rss_mb']:>10.1f}{metrics['construction_seconds']:>10.3f}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Résultats sauvegardés: {args.output}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.threshold * 100:.0f}%:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            raise SystemExit(1)
+        print(f"\n✅ Aucune régression au-delà de {args.threshold * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import sys
+import json
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, List, Any, Hashable, Iterator, Optional, Tuple
+
+
+class InternTable:
+    """Table d'internement : chaque valeur distincte (règle, explication...) reçoit un petit entier"""
+
+    __slots__ = ('values', '_ids', '_lock')
+
+    def __init__(self):
+        self.values: List[Hashable] = []
+        self._ids: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, value: Hashable) -> int:
+        """Identifiant de la valeur (ajoutée à la première rencontre)"""
+        value_id = self._ids.get(value)
+        if value_id is None:
+            with self._lock:
+                value_id = self._ids.get(value)
+                if value_id is None:
+                    value_id = len(self.values)
+                    self.values.append(value)
+                    self._ids[value] = value_id
+        return value_id
+
+    def __getitem__(self, value_id: int) -> Hashable:
+        return self.values[value_id]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _index_array(values: List[int]) -> array:
+    """Tableau d'entiers non signés le plus petit possible (2 ou 4 octets)"""
+    return array('H' if not values or max(values) < 1 << 16 else 'I', values)
+
+
+def _id_array(values: List[int]) -> array:
+    """Identifiants internés sur 1 octet tant que la table le permet"""
+    return array('B' if not values or max(values) < 1 << 8 else 'H', values)
+
+
+class CompactVerseResult(ABC):
+    """Résultat d'un verset en tableaux parallèles
+
+    ``positions[i]`` est la position du i-ème caractère analysé ; ses règles
+    sont ``rule_ids[rule_offsets[i]:rule_offsets[i + 1]]``, des identifiants
+    de la table partagée de l'analyseur. La forme dict/JSON habituelle est
+    reconstruite à la demande par ``to_dict()``.
+    """
+
+    __slots__ = ('analyzer', 'table', 'verse', 'verse_normalized', 'positions', 'rule_offsets', 'rule_ids')
+
+    def __init__(self, analyzer, table: InternTable, verse: str, verse_normalized: str,
+                 positions: List[int], hits: List[List[Hashable]]):
+        self.analyzer = analyzer
+        self.table = table
+        self.verse = verse
+        self.verse_normalized = verse_normalized
+        self.positions = _index_array(positions)
+
+        offsets, ids = [0], []
+        for values in hits:
+            ids.extend(table.intern(value) for value in values)
+            offsets.append(len(ids))
+        self.rule_offsets = _index_array(offsets)
+        self.rule_ids = _id_array(ids)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def hits_at(self, index: int) -> List[Hashable]:
+        """Valeurs internées du index-ième caractère analysé"""
+        start, end = self.rule_offsets[index], self.rule_offsets[index + 1]
+        return [self.table[value_id] for value_id in self.rule_ids[start:end]]
+
+    def iter_hits(self) -> Iterator[Tuple[int, List[Hashable]]]:
+        """(position, valeurs) pour chaque caractère analysé"""
+        for index, position in enumerate(self.positions):
+            yield position, self.hits_at(index)
+
+    def nbytes(self) -> int:
+        """Mémoire propre au résultat (tables partagées exclues)"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.verse) + sys.getsizeof(self.verse_normalized)
+        for name in self.__slots__[4:]:
+            size += sys.getsizeof(getattr(self, name))
+        return size
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        """Forme dict/JSON habituelle de l'analyseur d'origine"""
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+class CompactTreeResult(CompactVerseResult):
+    """Résultat compact de SimpleTajweedAnalyzer.analyze_verse (règles : (règle, méthode))"""
+
+    __slots__ = ('original_positions',)
+
+    def __init__(self, analyzer, table: InternTable, verse: str, verse_normalized: str,
+                 positions: List[int], hits: List[List[Hashable]],
+                 original_positions: Optional[List[int]] = None):
+        super().__init__(analyzer, table, verse, verse_normalized, positions, hits)
+        # Positions dans le texte d'origine (None si non demandées : pas de 'original_position')
+        self.original_positions = None if original_positions is None else _index_array(original_positions)
+
+    @classmethod
+    def from_result(cls, analyzer, table: InternTable, result: Dict[str, Any]) -> 'CompactTreeResult':
+        analysis = result['analysis']
+        return cls(analyzer, table, result['verse'], result['verse_normalized'],
+                   [entry['position'] for entry in analysis],
+                   [[(rule['rule'], rule['method']) for rule in entry['rules']] for entry in analysis],
+                   [entry['original_position'] for entry in analysis]
+                   if analysis and 'original_position' in analysis[0] else None)
+
+    def nbytes(self) -> int:
+        if self.original_positions is None:
+            return super().nbytes()
+        return super().nbytes() + sys.getsizeof(self.original_positions)
+
+    def to_dict(self) -> Dict[str, Any]:
+        text = self.verse_normalized
+        entries = []
+        methods_used = set()
+        for index, (position, hits) in enumerate(self.iter_hits()):
+            char_group = self.analyzer.tree_analyzer._get_character_group(text, position)[2]
+            rules = [{'rule': rule, 'method': method} for rule, method in hits]
+            methods_used.update(method for _, method in hits)
+            entry = {'position': position}
+            if self.original_positions is not None:
+                entry['original_position'] = self.original_positions[index]
+            entry.update({
+                'character': text[position],
+                'group': char_group,
+                'base_char': char_group[0] if char_group else '',
+                'rules': rules
+            })
+            entries.append(entry)
+
+        return {
+            'verse': self.verse,
+            'verse_normalized': text,
+            'analysis': entries,
+            'statistics': self.analyzer._generate_comprehensive_stats(entries),
+            'methods_used': list(methods_used)
+        }
+
+
+class CompactEnhancedResult(CompactVerseResult):
+    """Résultat compact de EnhancedTajweedAnalyzer.analyze_verse (règles : (règle, explication))
+
+    Le contexte (2 caractères avant, 2 après) n'est pas stocké : il est
+    recalculé depuis le texte normalisé.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_result(cls, analyzer, table: InternTable, result: Dict[str, Any]) -> 'CompactEnhancedResult':
+        analysis = result['analysis']
+        return cls(analyzer, table, result['verse'], result['verse'],
+                   [entry['position'] for entry in analysis],
+                   [[(rule['rule'], rule['explanation']) for rule in entry['rules']] for entry in analysis])
+
+    def to_dict(self) -> Dict[str, Any]:
+        text = self.verse_normalized
+        analysis_results = []
+        for position, hits in self.iter_hits():
+            context = text[max(0, position-2):min(len(text), position+3)]
+            analysis_results.append({
+                'position': position,
+                'character': text[position],
+                'rules': [{'rule': rule, 'explanation': explanation, 'context': context}
+                          for rule, explanation in hits],
+                'total_rules': len(hits),
+                'context': context
+            })
+
+        return {
+            'verse': text,
+            'analysis': analysis_results,
+            'statistics': self.analyzer._generate_statistics(analysis_results),
+            'summary': self.analyzer._generate_summary(analysis_results)
+        }
+
+
+class CompactCompleteResult(CompactVerseResult):
+    """Résultat compact de CompleteTajweedAnalyzer.summarize (au plus une règle par position)"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_result(cls, analyzer, table: InternTable, result: Dict[str, Any]) -> 'CompactCompleteResult':
+        detailed = result['detailed_rules']
+        text = "".join(entry['letter'] for entry in detailed)
+        return cls(analyzer, table, result['verse'], text,
+                   [entry['position'] for entry in detailed],
+                   [[entry['rule']] if entry['rule'] else [] for entry in detailed])
+
+    def to_dict(self) -> Dict[str, Any]:
+        text = self.verse_normalized
+        rules = []
+        for position, hits in self.iter_hits():
+            rule = hits[0] if hits else None
+            rules.append({
+                "position": position,
+                "letter": text[position],
+                "rule": rule,
+                "category": self.analyzer.get_category(rule),
+                "context": text[max(0,position-3):position+4]
+            })
+        return self.analyzer._summary_from_rules(self.verse, rules)
@@ -0,0 +1,159 @@
+from typing import Dict, List, Any, Iterator, Optional, Sequence
+
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+# Valeur ignorée par la perte CTC de Wav2Vec2ForCTC
+LABEL_PAD_ID = -100
+
+
+class DataCollatorCTCWithPadding:
+    """Assembler des exemples {"input_values", "labels"} en un batch paddé au plus long
+
+    L'audio est complété par ``padding_value`` (masque d'attention à 0 sur
+    le padding) et les labels par -100. Les compteurs ``real_samples`` et
+    ``padded_samples`` donnent le taux de padding des batches produits.
+    """
+
+    def __init__(self, padding_value: float = 0.0, pad_to_multiple_of: Optional[int] = None,
+                 return_attention_mask: bool = True):
+        self.padding_value = padding_value
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.return_attention_mask = return_attention_mask
+        self.real_samples = 0
+        self.padded_samples = 0
+
+    def _padded_length(self, length: int) -> int:
+        multiple = self.pad_to_multiple_of
+        if multiple:
+            return -(-length // multiple) * multiple
+        return length
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, torch.Tensor]:
+        inputs = [torch.as_tensor(feature["input_values"], dtype=torch.float32).reshape(-1) for feature in features]
+        labels = [torch.as_tensor(feature["labels"], dtype=torch.long).reshape(-1) for feature in features]
+
+        max_input = self._padded_length(max(len(values) for values in inputs))
+        max_label = max(len(values) for values in labels)
+
+        input_values = torch.full((len(inputs), max_input), self.padding_value, dtype=torch.float32)
+        attention_mask = torch.zeros((len(inputs), max_input), dtype=torch.long)
+        label_ids = torch.full((len(labels), max_label), LABEL_PAD_ID, dtype=torch.long)
+        for row, (values, ids) in enumerate(zip(inputs, labels)):
+            input_values[row, :len(values)] = values
+            attention_mask[row, :len(values)] = 1
+            label_ids[row, :len(ids)] = ids
+
+        self.real_samples += sum(len(values) for values in inputs)
+        self.padded_samples += len(inputs) * max_input
+
+        batch = {"input_values": input_values, "labels": label_ids}
+        if self.return_attention_mask:
+            batch["attention_mask"] = attention_mask
+        return batch
+
+    def padding_ratio(self) -> float:
+        """Part des échantillons audio ajoutés par le padding depuis la création"""
+        if not self.padded_samples:
+            return 0.0
+        return 1.0 - self.real_samples / self.padded_samples
+
+
+def padding_report(batches: Sequence[Sequence[int]], lengths: Sequence[int]) -> Dict[str, Any]:
+    """Échantillons réels / paddés (au plus long de chaque batch) pour une liste de batches"""
+    lengths = np.asarray(lengths)
+    real = padded = examples = 0
+    for batch in batches:
+        batch_lengths = lengths[np.asarray(batch, dtype=np.int64)]
+        real += int(batch_lengths.sum())
+        padded += int(batch_lengths.max()) * len(batch)
+        examples += len(batch)
+    return {
+        'batches': len(batches),
+        'examples': examples,
+        'real_samples': real,
+        'padded_samples': padded,
+        'padding_ratio': 1.0 - real / padded if padded else 0.0
+    }
+
+
+class LengthBucketSampler(Sampler):
+    """Batches d'exemples de durées proches, sous un budget d'échantillons paddés par batch
+
+    Les exemples sont mélangés, découpés en groupes de ``bucket_size``,
+    triés par longueur dans chaque groupe, puis regroupés tant que
+    (longueur max x nb d'exemples) reste sous ``max_batch_samples`` ; l'ordre
+    des batches est ensuite mélangé. Un exemple plus long que le budget
+    forme un batch à lui seul. À utiliser comme ``batch_sampler`` d'un
+    DataLoader ; ``set_epoch`` change le tirage à chaque époque.
+    """
+
+    def __init__(self, lengths: Sequence[int], max_batch_samples: int = 16000 * 200,
+                 bucket_size: int = 1000, shuffle: bool = True, seed: int = 42,
+                 max_batch_size: Optional[int] = None):
+        if max_batch_samples <= 0:
+            raise ValueError("max_batch_samples doit être positif")
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.max_batch_samples = max_batch_samples
+        self.bucket_size = bucket_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.max_batch_size = max_batch_size
+        self.epoch = 0
+        self._cache = None
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _batches(self) -> List[List[int]]:
+        if self._cache is not None and self._cache[0] == self.epoch:
+            return self._cache[1]
+
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+
+        batches: List[List[int]] = []
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind='stable')]
+
+            batch: List[int] = []
+            longest = 0
+            for index in bucket.tolist():
+                length = int(self.lengths[index])
+                candidate = max(longest, length)
+                full = self.max_batch_size is not None and len(batch) >= self.max_batch_size
+                if batch and (candidate * (len(batch) + 1) > self.max_batch_samples or full):
+                    batches.append(batch)
+                    batch, candidate = [], length
+                batch.append(index)
+                longest = candidate
+            if batch:
+                batches.append(batch)
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        self._cache = (self.epoch, batches)
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        return iter(self._batches())
+
+    def __len__(self) -> int:
+        return len(self._batches())
+
+    def padding_report(self) -> Dict[str, Any]:
+        """Taux de padding de l'époque courante, comparé à des batches aléatoires de même taille"""
+        batches = self._batches()
+        report = padding_report(batches, self.lengths)
+
+        # Référence : mêmes tailles de batch, exemples tirés au hasard
+        rng = np.random.default_rng(self.seed)
+        order = rng.permutation(len(self.lengths))
+        naive, start = [], 0
+        for batch in batches:
+            naive.append(order[start:start + len(batch)])
+            start += len(batch)
+        report['naive_padding_ratio'] = padding_report(naive, self.lengths)['padding_ratio']
+        return report
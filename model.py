@@ -1,169 +1,227 @@
 from datasets import load_dataset
-import librosa
 import numpy as np
+import json
+import os
+import time
+import random
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+import audio_preprocessing
+from audio_preprocessing import BatchResampler
+from audio_cache import AudioCache, audio_hash
+from training_store import TrainingStoreWriter, TrainingStore
+from data_collator import LengthBucketSampler
+
+from transformers import Wav2Vec2CTCTokenizer, Wav2Vec2FeatureExtractor, Wav2Vec2Processor
+
+DATASET_NAME = "Sabri12blm/Arabic-Quran-ASR-dataset"
+NB_EXEMPLES = 10000
+TARGET_SR = 16000
+
+# ============================================================================
+# PARTIE 1 : SUIVI DU DÉBIT PAR ÉTAPE
+# ============================================================================
+
+class PipelineStats:
+    """Temps et nombre d'éléments traités par chaque étape du pipeline"""
 
-print("Chargement du dataset en streaming...")
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.items = defaultdict(int)
+        self.audio_seconds = 0.0
+        # Somme de tous les temps enregistrés (pour isoler le temps propre d'une source)
+        self.total = 0.0
+        self.started = time.perf_counter()
 
-# Charger en streaming
-dataset_stream = load_dataset(
-    "Sabri12blm/Arabic-Quran-ASR-dataset",
-    split="train",
-    streaming=True
-)
+    def add(self, stage: str, seconds: float):
+        self.seconds[stage] += seconds
+        self.items[stage] += 1
+        self.total += seconds
 
-# Prendre 10 000 exemples
-subset_dataset = dataset_stream.take(10000)
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"\n Débit par étape ({elapsed:.1f} s au total, "
+              f"{self.audio_seconds / 3600:.2f} h d'audio) :")
+        for stage, seconds in self.seconds.items():
+            rate = self.items[stage] / seconds if seconds else float('inf')
+            print(f"   • {stage:<10} {self.items[stage]:>6} éléments  {seconds:>8.1f} s  {rate:>8.1f} éléments/s")
 
-print(" Dataset chargé en streaming (10 000 exemples)")
 
-# Vérifier quelques exemples
-print("\n Aperçu des premiers exemples :")
-for i, example in enumerate(subset_dataset):
-    print(f"\nExemple {i+1}:")
-    print(f"  Audio shape: {example['wave_filename']['array'].shape}")
-    print(f"  Transcript: {example['transcript']}")
-    if i >= 5:
-        break
+def timed_source(stage: str, iterable: Iterable, stats: PipelineStats) -> Iterator:
+    """Chronométrer la production de chaque élément d'une source
+
+    Le temps déjà attribué aux étapes en amont pendant l'attente est déduit.
+    """
+    iterator = iter(iterable)
+    while True:
+        started, upstream = time.perf_counter(), stats.total
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        stats.add(stage, time.perf_counter() - started - (stats.total - upstream))
+        yield item
+
+
+def timed_stage(stage: str, function, items: Iterable, stats: PipelineStats) -> Iterator:
+    """Appliquer une étape élément par élément (générateur : rien n'est accumulé)"""
+    for item in items:
+        started = time.perf_counter()
+        result = function(item)
+        stats.add(stage, time.perf_counter() - started)
+        yield result
+
+# ============================================================================
+# PARTIE 2 : CHARGEMENT EN STREAMING (UNE SEULE LECTURE)
+# ============================================================================
+
+def iter_dataset(nb_exemples: int = NB_EXEMPLES, apercu: int = 6) -> Iterator[Dict[str, Any]]:
+    """Lire le dataset en streaming une seule fois ; les premiers exemples sont affichés au passage"""
+    print("Chargement du dataset en streaming...")
+    dataset_stream = load_dataset(DATASET_NAME, split="train", streaming=True).take(nb_exemples)
+    print(f" Dataset chargé en streaming ({nb_exemples} exemples)")
+
+    print("\n Aperçu des premiers exemples :")
+    for i, example in enumerate(dataset_stream):
+        if i < apercu:
+            print(f"\nExemple {i+1}:")
+            print(f"  Audio shape: {example['wave_filename']['array'].shape}")
+            print(f"  Transcript: {example['transcript']}")
+        yield example
 
 # ============================================================================
-# PARTIE 3 : PRÉTRAITEMENT AUDIO 
+# PARTIE 3 : PRÉTRAITEMENT AUDIO
 # ============================================================================
 
 def preprocess_audio(audio_array, sr=44100):
     """
     Prétraiter l'audio pour Wav2Vec2
-    
+
     Étapes :
     1. Convertir en float32
     2. Normaliser entre -1 et 1
     3. Resampler à 16kHz (requis par Wav2Vec2)
+
+    Un clip silencieux (maximum nul) n'est pas divisé et reste à zéro.
+    """
+    return audio_preprocessing.preprocess_audio(audio_array, sr, TARGET_SR)
+
+
+def preprocess_examples(exemples: Iterable[Dict[str, Any]], resampler: BatchResampler,
+                        cache: Optional[AudioCache] = None, cache_by_hash: bool = False) -> Iterator[Dict[str, Any]]:
+    """Exemples bruts -> audio 16 kHz + transcription, resamplés en parallèle et dans l'ordre
+
+    Avec ``cache``, un clip déjà prétraité (même dataset, même index, mêmes
+    paramètres) est relu au lieu d'être resamplé. ``cache_by_hash`` identifie
+    le clip par le hash de son contenu plutôt que par son index (robuste à
+    un changement d'ordre du dataset, au prix d'un hash par clip).
     """
-    # Convertir en float32
-    audio_float = audio_array.astype(np.float32)
-    
-    # Normaliser (diviser par la valeur maximale absolue)
-    audio_float /= np.max(np.abs(audio_float))
-    
-    # Resampler à 16kHz (Wav2Vec2 attend cette fréquence)
-    audio_resampled = librosa.resample(y=audio_float, orig_sr=sr, target_sr=16000)
-    
-    return audio_resampled
-
-print("\n Prétraitement des exemples audio...")
-
-# Préparer les exemples (audio + transcription)
-processed_exemples = []
-
-# RE-charger le dataset car le streaming est épuisé
-subset_dataset = load_dataset(
-    "Sabri12blm/Arabic-Quran-ASR-dataset",
-    split="train",
-    streaming=True
-).take(10000)
-
-for i, example in enumerate(subset_dataset):
-    # Récupérer l'audio et la transcription
-    audio_array = example["wave_filename"]["array"]
-    transcript = example["transcript"]
-    
-    # Prétraiter l'audio
-    audio_processed = preprocess_audio(audio_array)
-    
-    # Stocker
-    processed_exemples.append({
-        "audio": audio_processed,
-        "transcript": transcript
-    })
-    
-    # Afficher progression tous les 1000
-    if (i + 1) % 1000 == 0:
-        print(f"  → {i + 1} exemples traités...")
-
-print(f"\n {len(processed_exemples)} exemples audio prétraités")
+    params = resampler.params()
+    pending = deque()
+
+    def finish(entry):
+        transcript, key, future, cached = entry
+        audio = future.result()
+        if cache is not None and not cached:
+            cache.put(key, audio)
+        return {"audio": audio, "transcript": transcript}
+
+    for index, example in enumerate(exemples):
+        key, audio = None, None
+        if cache is not None:
+            example_id = audio_hash(example["wave_filename"]["array"]) if cache_by_hash else index
+            key = cache.key(DATASET_NAME, example_id, params)
+            audio = cache.get(key)
+
+        if audio is not None:
+            future = Future()
+            future.set_result(audio)
+        else:
+            future = resampler.submit(example["wave_filename"]["array"])
+        pending.append((example["transcript"], key, future, audio is not None))
+
+        if len(pending) >= resampler.max_pending:
+            yield finish(pending.popleft())
+    while pending:
+        yield finish(pending.popleft())
 
 # ============================================================================
 # PARTIE 4 : CRÉATION DU TOKENIZER CORANIQUE (NOUVEAU)
 # ============================================================================
 
-from transformers import Wav2Vec2CTCTokenizer, Wav2Vec2FeatureExtractor, Wav2Vec2Processor
-import json
-import os
-
-print("\n" + "="*70)
-print(" CRÉATION DU TOKENIZER CORANIQUE")
-print("="*70)
-
 def creer_vocabulaire_coranique():
     """
     Créer le vocabulaire complet du Coran (approche optimisée)
     Pas besoin d'analyser le dataset : le Coran a un vocabulaire fixe !
     """
-    
+
     print("\n Création du vocabulaire coranique...")
-    
+
     # Lettres arabes de base (28)
     lettres = [
         'ا', 'ب', 'ت', 'ث', 'ج', 'ح', 'خ', 'د', 'ذ', 'ر',
         'ز', 'س', 'ش', 'ص', 'ض', 'ط', 'ظ', 'ع', 'غ', 'ف',
         'ق', 'ك', 'ل', 'م', 'ن', 'ه', 'و', 'ي'
     ]
-    
+
     # Variantes (Hamza, Alif, etc.)
     variantes = ['أ', 'إ', 'آ', 'ة', 'ى', 'ئ', 'ؤ', 'ء']
-    
+
     # Diacritiques (IMPORTANT pour le Coran)
     diacritiques = [
         'َ', 'ِ', 'ُ', 'ْ', 'ّ', 'ً', 'ٍ', 'ٌ', 'ٰ', 'ٓ',
         'ٖ', 'ٗ', '٘', 'ٙ', 'ٚ', 'ٛ', 'ٜ', 'ٝ', 'ٞ', 'ٟ'
     ]
-    
+
     # Signes coraniques
     signes = ['۩', '۞', '۝', '﴾', '﴿']
-    
+
     # Chiffres arabes
     chiffres = ['٠', '١', '٢', '٣', '٤', '٥', '٦', '٧', '٨', '٩']
-    
+
     # Combiner tout
     vocabulaire = lettres + variantes + diacritiques + signes + chiffres
-    
+
     # Trier et enlever doublons
     vocabulaire = sorted(list(set(vocabulaire)))
-    
+
     print(f" Vocabulaire créé : {len(vocabulaire)} caractères")
-    
+
     return vocabulaire
 
 def creer_tokenizer_quran(vocabulaire, save_dir="./tokenizer_quran"):
     """
     Créer le tokenizer CTC pour le Coran
     """
-    
+
     print(f"\n Création du tokenizer...")
-    
+
     # Créer le dossier de sauvegarde
     os.makedirs(save_dir, exist_ok=True)
-    
+
     # Créer le dictionnaire vocabulaire avec IDs
     vocab_dict = {}
-    
+
     # Tokens spéciaux (IDs 0, 1, 2)
     vocab_dict["<pad>"] = 0
     vocab_dict["<unk>"] = 1
     vocab_dict["|"] = 2  # Séparateur de mots
-    
+
     # Ajouter les caractères coraniques (IDs à partir de 3)
     for i, char in enumerate(vocabulaire):
         vocab_dict[char] = i + 3
-    
+
     print(f"   • Taille vocabulaire total : {len(vocab_dict)} tokens")
-    
+
     # Sauvegarder vocab.json
     vocab_file = os.path.join(save_dir, "vocab.json")
     with open(vocab_file, 'w', encoding='utf-8') as f:
         json.dump(vocab_dict, f, ensure_ascii=False, indent=2)
-    
+
     print(f"   • vocab.json sauvegardé : {vocab_file}")
-    
+
     # Créer le tokenizer
     tokenizer = Wav2Vec2CTCTokenizer(
         vocab_file=vocab_file,
@@ -172,182 +230,217 @@ def creer_tokenizer_quran(vocabulaire, save_dir="./tokenizer_quran"):
         word_delimiter_token="|",
         do_lower_case=False  # Important pour l'arabe !
     )
-    
+
     # Sauvegarder le tokenizer complet
     tokenizer.save_pretrained(save_dir)
-    
+
     print(f" Tokenizer sauvegardé dans : {save_dir}")
-    
+
     return tokenizer
 
-# Créer le vocabulaire et le tokenizer
-vocabulaire = creer_vocabulaire_coranique()
-tokenizer = creer_tokenizer_quran(vocabulaire)
 
-# Tester le tokenizer
-print("\n Test du tokenizer :")
-texte_test = "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ"
-tokens = tokenizer.tokenize(texte_test)
-token_ids = tokenizer.convert_tokens_to_ids(tokens)
-decode = tokenizer.decode(token_ids)
+def tester_tokenizer(tokenizer):
+    """Vérifier qu'un verset connu ne produit aucun <unk>"""
+    print("\n Test du tokenizer :")
+    texte_test = "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ"
+    tokens = tokenizer.tokenize(texte_test)
+    token_ids = tokenizer.convert_tokens_to_ids(tokens)
+    decode = tokenizer.decode(token_ids)
 
-print(f"   Texte original : {texte_test}")
-print(f"   Tokens        : {tokens}")
-print(f"   Nombre tokens : {len(tokens)}")
-print(f"   Token IDs     : {token_ids[:20]}...")  # Premiers 20 IDs
-print(f"   Décodé        : {decode}")
-print(f"   <unk> count   : {tokens.count('<unk>')} (devrait être 0!)")
+    print(f"   Texte original : {texte_test}")
+    print(f"   Tokens        : {tokens}")
+    print(f"   Nombre tokens : {len(tokens)}")
+    print(f"   Token IDs     : {token_ids[:20]}...")  # Premiers 20 IDs
+    print(f"   Décodé        : {decode}")
+    print(f"   <unk> count   : {tokens.count('<unk>')} (devrait être 0!)")
 
 # ============================================================================
 # PARTIE 5 : CRÉATION DU PROCESSOR (Feature Extractor + Tokenizer)
 # ============================================================================
 
-print("\n" + "="*70)
-print(" CRÉATION DU PROCESSOR COMPLET")
-print("="*70)
-
-# Le Feature Extractor (garde celui pré-entraîné de Wav2Vec2)
-feature_extractor = Wav2Vec2FeatureExtractor(
-    feature_size=1,
-    sampling_rate=16000,  # Fréquence qu'on a utilisée
-    padding_value=0.0,
-    do_normalize=True,
-    return_attention_mask=True
-)
-
-# Combiner Feature Extractor + Tokenizer = Processor
-processor = Wav2Vec2Processor(
-    feature_extractor=feature_extractor,
-    tokenizer=tokenizer
-)
-
-# Sauvegarder le processor complet
-processor.save_pretrained("./processor_quran")
-print(" Processor sauvegardé dans : ./processor_quran")
+def creer_processor(tokenizer, save_dir="./processor_quran"):
+    """Feature extractor Wav2Vec2 (16 kHz) + tokenizer coranique"""
+    print("\n" + "="*70)
+    print(" CRÉATION DU PROCESSOR COMPLET")
+    print("="*70)
+
+    # Le Feature Extractor (garde celui pré-entraîné de Wav2Vec2)
+    feature_extractor = Wav2Vec2FeatureExtractor(
+        feature_size=1,
+        sampling_rate=TARGET_SR,  # Fréquence qu'on a utilisée
+        padding_value=0.0,
+        do_normalize=True,
+        return_attention_mask=True
+    )
 
-# ============================================================================
-# PARTIE 6 : PRÉPARER LE DATASET POUR L'ENTRAÎNEMENT
-# ============================================================================
+    # Combiner Feature Extractor + Tokenizer = Processor
+    processor = Wav2Vec2Processor(
+        feature_extractor=feature_extractor,
+        tokenizer=tokenizer
+    )
 
-print("\n" + "="*70)
-print("PRÉPARATION DU DATASET POUR TRAINING")
-print("="*70)
+    # Sauvegarder le processor complet
+    processor.save_pretrained(save_dir)
+    print(f" Processor sauvegardé dans : {save_dir}")
 
-def prepare_dataset_for_training(processed_exemples, processor):
-    """
-    Préparer les données pour l'entraînement Wav2Vec2
-    """
-    
-    print(f"\n Conversion de {len(processed_exemples)} exemples...")
-    
-    dataset_ready = []
-    
-    for i, exemple in enumerate(processed_exemples):
-        audio = exemple["audio"]
-        text = exemple["transcript"]
-        
-        # Traiter l'audio avec le feature extractor
-        input_values = processor.feature_extractor(
-            audio,
-            sampling_rate=16000,
-            return_tensors="pt"
-        ).input_values[0]  # Enlever la dimension batch
-        
-        # Traiter le texte avec le tokenizer
-        with processor.as_target_processor():
-            labels = processor.tokenizer(text).input_ids
-        
-        # Créer l'exemple formaté
-        dataset_ready.append({
-            "input_values": input_values,
-            "labels": labels
-        })
-        
-        # Progression
-        if (i + 1) % 1000 == 0:
-            print(f"   → {i + 1}/{len(processed_exemples)} convertis...")
-    
-    print(f"Dataset prêt : {len(dataset_ready)} exemples")
-    
-    return dataset_ready
-
-# Préparer le dataset
-dataset_ready = prepare_dataset_for_training(processed_exemples, processor)
-
-# Afficher un exemple
-print("\n Exemple de données prêtes pour l'entraînement :")
-exemple = dataset_ready[0]
-print(f"   input_values shape : {exemple['input_values'].shape}")
-print(f"   labels (premiers 20): {exemple['labels'][:20]}")
-print(f"   labels length     : {len(exemple['labels'])}")
+    return processor
 
 # ============================================================================
-# PARTIE 7 : SPLIT TRAIN/VALIDATION
+# PARTIE 6 : PRÉPARER LE DATASET POUR L'ENTRAÎNEMENT
 # ============================================================================
 
-print("\n" + "="*70)
-print(" SPLIT TRAIN/VALIDATION")
-print("="*70)
+def extract_features(exemple: Dict[str, Any], processor) -> Dict[str, Any]:
+    """Audio 16 kHz -> input_values (float32, sans dimension batch)"""
+    input_values = processor.feature_extractor(
+        exemple["audio"],
+        sampling_rate=TARGET_SR,
+        return_tensors="np"
+    ).input_values[0].astype(np.float32)
+    return {"input_values": input_values, "transcript": exemple["transcript"]}
 
-from sklearn.model_selection import train_test_split
 
-# Split 90% train / 10% validation
-train_data, val_data = train_test_split(
-    dataset_ready, 
-    test_size=0.1, 
-    random_state=42
-)
+def tokenize_labels(exemple: Dict[str, Any], processor) -> Dict[str, Any]:
+    """Transcription -> ids du tokenizer"""
+    with processor.as_target_processor():
+        labels = processor.tokenizer(exemple["transcript"]).input_ids
+    return {"input_values": exemple["input_values"], "labels": labels}
 
-print(f" Split effectué :")
-print(f"   • Train : {len(train_data)} exemples")
-print(f"   • Validation : {len(val_data)} exemples")
+
+def prepare_dataset_for_training(processed_exemples: Iterable[Dict[str, Any]], processor,
+                                 stats: Optional[PipelineStats] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Préparer les données pour l'entraînement Wav2Vec2
+
+    Générateur : chaque exemple {"audio", "transcript"} devient
+    {"input_values", "labels"} au moment où il est consommé.
+    """
+    stats = stats if stats is not None else PipelineStats()
+    features = timed_stage("features", lambda exemple: extract_features(exemple, processor),
+                           processed_exemples, stats)
+    return timed_stage("tokenize", lambda exemple: tokenize_labels(exemple, processor), features, stats)
 
 # ============================================================================
-# PARTIE 8 : SAUVEGARDER LES DONNÉES PRÉPARÉES
+# PARTIE 7 : SPLIT TRAIN/VALIDATION ET ÉCRITURE DU STORE
 # ============================================================================
 
-print("\n" + "="*70)
-print(" SAUVEGARDE DES DONNÉES")
-print("="*70)
-
-import pickle
+def run_pipeline(processor, nb_exemples: int = NB_EXEMPLES, output_dir: str = "prepared_data",
+                 val_ratio: float = 0.1, seed: int = 42,
+                 workers: Optional[int] = None, cache_dir: Optional[str] = "audio_cache",
+                 cache_max_bytes: int = 8 * 1024 ** 3) -> Dict[str, Any]:
+    """Décodage -> resampling -> features -> tokenisation -> écriture, en une seule lecture du stream
+
+    Le split train/validation est tiré exemple par exemple (graine fixe) :
+    la mémoire reste bornée par les exemples en cours, quel que soit
+    ``nb_exemples``. Le resampling est réparti sur ``workers`` processus
+    (défaut : nb de cœurs). Chaque split est écrit dans un store mappable
+    (training_store), relu par TrainingStore. Les clips prétraités sont
+    gardés dans ``cache_dir`` (None pour désactiver le cache).
+    """
+    stats = PipelineStats()
+    rng = random.Random(seed)
+    writers = {split: TrainingStoreWriter(os.path.join(output_dir, split)) for split in ("train", "val")}
+    resampler = BatchResampler(audio_preprocessing.ORIG_SR, TARGET_SR, workers)
+    cache = AudioCache(cache_dir, cache_max_bytes) if cache_dir else None
+
+    exemples = timed_source("decode", iter_dataset(nb_exemples), stats)
+    audios = timed_source("resample", preprocess_examples(exemples, resampler, cache), stats)
+    records = prepare_dataset_for_training(audios, processor, stats)
+
+    for i, record in enumerate(records):
+        if i == 0:
+            print("\n Exemple de données prêtes pour l'entraînement :")
+            print(f"   input_values shape : {record['input_values'].shape}")
+            print(f"   labels (premiers 20): {record['labels'][:20]}")
+            print(f"   labels length     : {len(record['labels'])}")
+
+        stats.audio_seconds += len(record["input_values"]) / TARGET_SR
+        split = "val" if rng.random() < val_ratio else "train"
+        started = time.perf_counter()
+        writers[split].write(record)
+        stats.add("write", time.perf_counter() - started)
+
+        # Afficher progression tous les 1000
+        if (i + 1) % 1000 == 0:
+            print(f"  → {i + 1} exemples traités...")
 
-# Sauvegarder les données préparées
-with open("train_data.pkl", "wb") as f:
-    pickle.dump(train_data, f)
+    for writer in writers.values():
+        writer.close()
+    resampler.close()
+    stats.report()
 
-with open("val_data.pkl", "wb") as f:
-    pickle.dump(val_data, f)
+    if cache is not None:
+        cache_stats = cache.stats()
+        cache.close()
+        print(f"\n Cache audio ({cache_dir}) : {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.1%}), {cache_stats['evictions']} évictions, "
+              f"{cache_stats['stored']} clips ({cache_stats['bytes'] / 1024 ** 2:.0f} Mo / "
+              f"{cache_stats['max_bytes'] / 1024 ** 2:.0f} Mo)")
 
-print(" Données sauvegardées :")
-print("   • train_data.pkl")
-print("   • val_data.pkl")
+    return {split: writer for split, writer in writers.items()}
 
 # ============================================================================
-# RÉCAPITULATIF FINAL
+# PARTIE 8 : SCRIPT PRINCIPAL
 # ============================================================================
 
-print("\n" + "="*70)
-print(" PRÉPARATION TERMINÉE !")
-print("="*70)
-print("\n RÉSUMÉ :")
-print(f"    Dataset chargé : 10 000 exemples")
-print(f"    Audio prétraité : 16kHz, normalisé")
-print(f"    Tokenizer créé : {len(tokenizer)} tokens (arabe coranique)")
-print(f"    Processor créé : Feature Extractor + Tokenizer")
-print(f"    Dataset formaté : input_values + labels")
-print(f"    Split effectué : {len(train_data)} train / {len(val_data)} val")
-print(f"    Données sauvegardées")
-
-print("\n PROCHAINES ÉTAPES :")
-print("   1. Charger le modèle Wav2Vec2")
-print("   2. Créer le Data Collator")
-print("   3. Configurer le Trainer")
-print("   4. Lancer le fine-tuning")
-
-print("\n FICHIERS CRÉÉS :")
-print("   • ./tokenizer_quran/")
-print("   • ./processor_quran/")
-print("   • train_data.pkl")
-print("   • val_data.pkl")
-
+def main():
+    print("\n" + "="*70)
+    print(" CRÉATION DU TOKENIZER CORANIQUE")
+    print("="*70)
+
+    # Créer le vocabulaire et le tokenizer
+    vocabulaire = creer_vocabulaire_coranique()
+    tokenizer = creer_tokenizer_quran(vocabulaire)
+    tester_tokenizer(tokenizer)
+    processor = creer_processor(tokenizer)
+
+    print("\n" + "="*70)
+    print("PRÉPARATION DU DATASET POUR TRAINING")
+    print("="*70)
+
+    writers = run_pipeline(processor)
+    train, val = writers["train"], writers["val"]
+
+    # ========================================================================
+    # BATCHES PAR LONGUEUR (padding dynamique)
+    # ========================================================================
+
+    train_store = TrainingStore(train.directory)
+    sampler = LengthBucketSampler(train_store.input_lengths())
+    report = sampler.padding_report()
+    print(f"\n Batches par longueur : {report['batches']} batches "
+          f"(≤ {sampler.max_batch_samples / TARGET_SR:.0f} s d'audio paddé par batch)")
+    print(f"   • Padding : {report['padding_ratio']:.1%} "
+          f"(batches aléatoires de même taille : {report['naive_padding_ratio']:.1%})")
+
+    # ========================================================================
+    # RÉCAPITULATIF FINAL
+    # ========================================================================
+
+    print("\n" + "="*70)
+    print(" PRÉPARATION TERMINÉE !")
+    print("="*70)
+    print("\n RÉSUMÉ :")
+    print(f"    Dataset chargé : {train.count + val.count} exemples (une seule lecture du stream)")
+    print(f"    Audio prétraité : 16kHz, normalisé")
+    print(f"    Tokenizer créé : {len(tokenizer)} tokens (arabe coranique)")
+    print(f"    Processor créé : Feature Extractor + Tokenizer")
+    print(f"    Dataset formaté : input_values + labels")
+    print(f"    Split effectué : {train.count} train / {val.count} val")
+    print(f"    Données sauvegardées par lots")
+
+    print("\n PROCHAINES ÉTAPES :")
+    print("   1. Charger le modèle Wav2Vec2")
+    print("   2. DataLoader(TrainingStore(...), batch_sampler=LengthBucketSampler(...),")
+    print("      collate_fn=DataCollatorCTCWithPadding())  (labels paddés à -100)")
+    print("   3. Configurer le Trainer (ou une boucle d'entraînement) avec ce DataLoader")
+    print("   4. Lancer le fine-tuning")
+
+    print("\n FICHIERS CRÉÉS :")
+    print("   • ./tokenizer_quran/")
+    print("   • ./processor_quran/")
+    print(f"   • {train.directory}/ ({len(train.shards)} lots, input_values float32 + labels int32)")
+    print(f"   • {val.directory}/ ({len(val.shards)} lots, à relire avec training_store.TrainingStore)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+import gzip
+import json
+from typing import Dict, Any, Iterator, Optional
+
+
+class NDJSONWriter:
+    """Écriture d'un enregistrement JSON compact par ligne, au fil de l'eau
+
+    ``path`` vaut '-' pour la sortie standard ; la compression gzip est
+    activée par ``compress=True`` ou par l'extension '.gz'.
+    """
+
+    def __init__(self, path: str = "-", compress: Optional[bool] = None):
+        self.path = path
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self.records = 0
+
+        if path == "-":
+            self._owned = False
+            self._stream = (gzip.open(sys.stdout.buffer, 'wt', encoding='utf-8')
+                            if self.compress else sys.stdout)
+        else:
+            self._owned = True
+            self._stream = (gzip.open(path, 'wt', encoding='utf-8')
+                            if self.compress else open(path, 'w', encoding='utf-8'))
+
+    def write(self, record: Dict[str, Any]):
+        """Écrire un enregistrement (aucune accumulation en mémoire)"""
+        self._stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._stream.write("\n")
+        self.records += 1
+
+    def close(self):
+        if self._owned or self.compress:
+            self._stream.close()
+        if not self._owned:
+            sys.stdout.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_ayahs(quran_path: str) -> Iterator[tuple]:
+    """(sourate, numéro d'ayah, texte) dans l'ordre du corpus"""
+    with open(quran_path, 'r', encoding='utf-8') as f:
+        surahs = json.load(f)
+    for surah in sorted(surahs, key=lambda s: s['number']):
+        for ayah in sorted(surah['ayahs'], key=lambda a: a['numberInSurah']):
+            yield surah['number'], ayah['numberInSurah'], ayah['text']
+
+
+def iter_verse_records(analyzer, verses: Iterator[tuple], mode: str = "verse") -> Iterator[Dict[str, Any]]:
+    """Enregistrements produits un à un : un par ayah ('verse') ou un par segment de règle ('spans')"""
+    for surah, ayah, text in verses:
+        if mode == "spans":
+            for rule, start, end in analyzer.iter_rule_spans(text):
+                yield {'surah': surah, 'ayah': ayah, 'rule': rule, 'start': start, 'end': end}
+        else:
+            result = analyzer.analyze_verse(text)
+            yield {'surah': surah, 'ayah': ayah, **result}
+
+
+def write_records(records: Iterator[Dict[str, Any]], path: str = "-", compress: Optional[bool] = None) -> int:
+    """Écrire un flux d'enregistrements en NDJSON ; retourne le nombre écrit"""
+    with NDJSONWriter(path, compress) as writer:
+        for record in records:
+            writer.write(record)
+        return writer.records
@@ -0,0 +1,129 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from types import CodeType
+from typing import Any, Callable, Dict, Optional
+
+from bounded_cache import BoundedLRUCache
+
+# Version du format stocké (à incrémenter si la sérialisation change). Les
+# versions des analyseurs couvrent leurs tables et les méthodes passées à
+# code_fingerprint ; toute autre modification de code qui change les résultats
+# (normalisation, statistiques...) impose d'incrémenter cette valeur à la main.
+RESULT_CACHE_VERSION = 1
+
+
+def content_version(*parts: Any) -> str:
+    """Empreinte de la configuration d'un analyseur (patterns, arbres...)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _code_parts(code: CodeType) -> list:
+    """Bytecode et constantes d'une fonction, fonctions imbriquées comprises"""
+    parts = [code.co_code.hex(), list(code.co_names)]
+    for const in code.co_consts:
+        parts.append(_code_parts(const) if isinstance(const, CodeType) else repr(const))
+    return parts
+
+
+def code_fingerprint(*functions: Callable) -> str:
+    """Empreinte du code de fonctions (logique et tables littérales qu'elles contiennent)
+
+    Dépend aussi de la version de Python : un changement d'interpréteur
+    invalide simplement les entrées.
+    """
+    return content_version(*(_code_parts(function.__code__) for function in functions))
+
+
+class VerseResultCache:
+    """Cache des résultats par verset : LRU en mémoire devant un fichier SQLite
+
+    La clé est le hash du texte normalisé, du nom de l'analyseur et de sa
+    version (empreinte des arbres ou des patterns) : un changement d'arbres
+    produit d'autres clés, les anciennes entrées ne sont simplement plus lues.
+    Les résultats sont stockés en JSON compact compressé (zlib).
+    """
+
+    def __init__(self, path: str = "tajwid_results.sqlite", memory: Optional[BoundedLRUCache] = None):
+        self.path = path
+        self.memory = memory if memory is not None else BoundedLRUCache(max_entries=2048)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(analyzer_name: str, version: str, verse_normalized: str) -> str:
+        """Clé d'un résultat : hash(analyseur + version + texte normalisé)"""
+        payload = f"{RESULT_CACHE_VERSION}\0{analyzer_name}\0{version}\0{verse_normalized}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Résultat en cache (nouvel objet à chaque appel) ou None"""
+        serialized = self.memory.get(key)
+        if serialized is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return json.loads(serialized)
+
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+
+        serialized = zlib.decompress(row[0]).decode('utf-8')
+        self.memory.put(key, serialized)
+        return json.loads(serialized)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Enregistrer un résultat dans les deux niveaux"""
+        serialized = json.dumps(result, ensure_ascii=False, separators=(',', ':'))
+        self.memory.put(key, serialized)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                (key, zlib.compress(serialized.encode('utf-8')), time.time())
+            )
+            self._connection.commit()
+
+    def clear(self):
+        """Vider les deux niveaux"""
+        self.memory.clear()
+        with self._lock:
+            self._connection.execute("DELETE FROM results")
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits mémoire / disque, misses et taille du fichier"""
+        with self._lock:
+            stored = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'stored': stored,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import pickle
+import hashlib
+import logging
+import marshal
+import tempfile
+from typing import Dict, List, Any, Callable, Optional
+
+from rule_compiler import trees_hash, tree_attributes, generate_module_source
+
+logger = logging.getLogger(__name__)
+
+# Version du format du bundle (à incrémenter si son contenu change)
+BUNDLE_VERSION = 1
+
+# Règles supportées par cpfair/quran-tajweed
+RULE_NAMES = [
+    'ghunnah', 'idghaam_ghunnah', 'idghaam_mutajanisayn',
+    'idghaam_mutaqaribayn', 'idghaam_no_ghunnah', 'idghaam_shafawi',
+    'ikhfa', 'ikhfa_shafawi', 'iqlab', 'lam_shamsiyyah', 'madd_2',
+    'madd_246', 'madd_6', 'madd_munfasil', 'madd_muttasil',
+    'qalqalah', 'silent', 'hamzat_wasl'
+]
+
+# Tailles de contexte pour chaque règle (lookbehind, lookahead)
+CONTEXT_SIZES = {
+    "ghunnah": (3, 1),
+    "hamzat_wasl": (1, 0),
+    "idghaam_ghunnah": (1, 3),
+    "idghaam_mutajanisayn": (0, 2),
+    "idghaam_mutaqaribayn": (1, 2),
+    "idghaam_no_ghunnah": (0, 3),
+    "idghaam_shafawi": (0, 2),
+    "ikhfa": (0, 3),
+    "ikhfa_shafawi": (0, 2),
+    "iqlab": (0, 2),
+    "lam_shamsiyyah": (1, 1),
+    "madd_2": (0, 1),
+    "madd_246": (1, 2),
+    "madd_6": (1, 1),
+    "madd_munfasil": (1, 2),
+    "madd_muttasil": (0, 3),
+    "qalqalah": (1, 1),
+    "silent": (0, 1),
+    "END": (1, 0)
+}
+
+
+def default_bundle_path(trees_dir: str) -> str:
+    """Bundle placé à côté du dossier des arbres (rule_trees -> rule_trees.bundle)"""
+    return os.path.normpath(trees_dir) + ".bundle"
+
+
+def tree_files(trees_dir: str) -> List[str]:
+    """Fichiers source start/end de chaque règle"""
+    return [
+        os.path.join(trees_dir, f"{rule}.{kind}.json")
+        for rule in RULE_NAMES for kind in ('start', 'end')
+    ]
+
+
+def source_signatures(trees_dir: str, previous: Optional[Dict[str, Optional[tuple]]] = None
+                      ) -> Dict[str, Optional[tuple]]:
+    """(mtime_ns, taille, sha256) de chaque fichier source (None si absent)
+
+    Un fichier dont la date et la taille n'ont pas changé depuis ``previous``
+    reprend son hash sans être relu : seul un os.stat par fichier au
+    chargement normal. Le hash évite une reconstruction quand seule la date
+    change (touch, checkout) sans modification du contenu.
+    """
+    previous = previous or {}
+    signatures = {}
+    for path in tree_files(trees_dir):
+        name = os.path.basename(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signatures[name] = None
+            continue
+        known = previous.get(name)
+        if known is not None and len(known) == 3 and tuple(known[:2]) == (stat.st_mtime_ns, stat.st_size):
+            signatures[name] = tuple(known)
+            continue
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            signatures[name] = None
+        else:
+            signatures[name] = (stat.st_mtime_ns, stat.st_size, digest)
+    return signatures
+
+
+def _same_sources(recorded: Dict[str, Optional[tuple]], current: Dict[str, Optional[tuple]]) -> bool:
+    """Mêmes fichiers et même contenu (la date seule ne compte pas)"""
+    if recorded.keys() != current.keys():
+        return False
+    return all(
+        (old is None) == (new is None) and (old is None or tuple(old)[1:] == tuple(new)[1:])
+        for old, new in ((recorded[name], current[name]) for name in current)
+    )
+
+
+def load_rule_trees(trees_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Charger les arbres de décision depuis les fichiers JSON"""
+    trees = {}
+
+    for rule in RULE_NAMES:
+        try:
+            with open(os.path.join(trees_dir, f"{rule}.start.json"), 'r', encoding='utf-8') as f:
+                start_tree = json.load(f)
+            with open(os.path.join(trees_dir, f"{rule}.end.json"), 'r', encoding='utf-8') as f:
+                end_tree = json.load(f)
+
+            trees[rule] = {
+                'start': start_tree,
+                'end': end_tree
+            }
+        except FileNotFoundError:
+            logger.warning("Arbres non trouvés pour: %s", rule)
+            continue
+
+    return trees
+
+
+def build_bundle(trees_dir: str = "rule_trees", bundle_path: Optional[str] = None) -> Dict[str, Any]:
+    """Lire les arbres JSON, précalculer les métadonnées et écrire le bundle"""
+    signatures = source_signatures(trees_dir)
+    rule_trees = load_rule_trees(trees_dir)
+    source = generate_module_source(rule_trees)
+
+    bundle = {
+        'version': BUNDLE_VERSION,
+        'sources': signatures,
+        'trees_hash': trees_hash(rule_trees),
+        'rule_trees': rule_trees,
+        'context_sizes': dict(CONTEXT_SIZES),
+        'tree_attributes': {
+            rule_name: {kind: tree_attributes(trees[kind]) for kind in ('start', 'end')}
+            for rule_name, trees in rule_trees.items()
+        },
+        'compiled_source': source,
+        # Bytecode des arbres compilés, valable pour cette version de Python uniquement
+        'cache_tag': sys.implementation.cache_tag,
+        'compiled_code': marshal.dumps(compile(source, "<rule_bundle>", "exec")),
+    }
+
+    _write_bundle(bundle, bundle_path or default_bundle_path(trees_dir))
+    return bundle
+
+
+def _write_bundle(bundle: Dict[str, Any], path: str):
+    """Écriture atomique : un processus ou thread concurrent ne lit jamais un bundle partiel"""
+    temporary = None
+    try:
+        # Nom unique dans le même dossier (os.replace reste atomique)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                         delete=False) as f:
+            temporary = f.name
+            pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning("Bundle non écrit (%s): %s", path, e)
+        if temporary is not None and os.path.exists(temporary):
+            os.unlink(temporary)
+
+
+def load_bundle(trees_dir: str = "rule_trees", bundle_path: Optional[str] = None) -> Dict[str, Any]:
+    """Charger le bundle, reconstruit s'il manque ou si le contenu d'un arbre source a changé
+
+    Seuls les fichiers dont la date ou la taille diffère du bundle sont
+    relus et hashés (voir source_signatures).
+    """
+    path = bundle_path or default_bundle_path(trees_dir)
+
+    try:
+        with open(path, 'rb') as f:
+            bundle = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        bundle = None
+
+    if (not isinstance(bundle, dict) or bundle.get('version') != BUNDLE_VERSION
+            or not isinstance(bundle.get('sources'), dict)
+            or bundle.get('context_sizes') != CONTEXT_SIZES):
+        return build_bundle(trees_dir, path)
+
+    signatures = source_signatures(trees_dir, bundle['sources'])
+    if not _same_sources(bundle['sources'], signatures):
+        return build_bundle(trees_dir, path)
+    if signatures != bundle['sources']:
+        # Seules les dates ont changé : les mémoriser pour ne plus rehasher ces fichiers
+        bundle['sources'] = signatures
+        _write_bundle(bundle, path)
+
+    return bundle
+
+
+def bundle_rules(bundle: Dict[str, Any]) -> Dict[str, Dict[str, Callable]]:
+    """Fonctions compilées {règle: {'start': f, 'end': f}} du bundle"""
+    if bundle.get('cache_tag') == sys.implementation.cache_tag:
+        code = marshal.loads(bundle['compiled_code'])
+    else:
+        code = compile(bundle['compiled_source'], "<rule_bundle>", "exec")
+
+    namespace: Dict[str, Any] = {}
+    exec(code, namespace)
+    if namespace.get('TREES_HASH') != bundle['trees_hash']:
+        raise ValueError("Bundle incohérent : arbres compilés et arbres JSON diffèrent")
+    return namespace['RULES']
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Regrouper les arbres rule_trees/ en un seul bundle")
+    parser.add_argument("--trees-dir", default="rule_trees")
+    parser.add_argument("--output", default=None, help="Chemin du bundle (défaut: <trees-dir>.bundle)")
+    args = parser.parse_args()
+
+    bundle = build_bundle(args.trees_dir, args.output)
+    print(f"📦 {len(bundle['rule_trees'])} règles regroupées dans "
+          f"{args.output or default_bundle_path(args.trees_dir)}")
+    print(f"   Empreinte des arbres: {bundle['trees_hash'][:16]}")
+
+
+if __name__ == "__main__":
+    main()
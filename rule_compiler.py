@@ -0,0 +1,189 @@
+import os
+import json
+import hashlib
+import importlib.util
+from typing import Dict, List, Any, Callable, Optional
+
+# Gain mesuré : ~1.4x par évaluation seulement (2:282, 18 648 évaluations 'start' sur
+# attributs précalculés : 0.038 s avec _evaluate_tree, 0.027 s compilé). Les arbres
+# sont peu profonds (1 à 3 nœuds parcourus en moyenne, 10 au plus) : la récursion
+# et les lectures de dict économisées pèsent peu ; l'essentiel du temps d'analyse
+# reste le calcul des attributs (voir rule_profiler).
+
+# En-tête des modules générés (le hash permet de détecter un module périmé)
+GENERATED_HEADER = "# Généré automatiquement par rule_compiler.py - ne pas modifier\n"
+
+
+def trees_hash(rule_trees: Dict[str, Dict[str, Any]]) -> str:
+    """Empreinte stable de l'ensemble des arbres"""
+    payload = json.dumps(rule_trees, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def tree_attributes(tree: Dict) -> List[str]:
+    """Noms d'attributs référencés par un arbre (ordre de parcours, sans doublon)"""
+    names: List[str] = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if 'label' in node:
+            continue
+        if node['attribute'] not in names:
+            names.append(node['attribute'])
+        stack.extend((node['lt'], node['gt']))
+    return names
+
+
+def parse_context_key(key: str) -> Optional[tuple]:
+    """Découper une clé '{offset}_{attribut}' telle que produite par _get_context_attributes"""
+    offset_str, _, name = key.partition('_')
+    try:
+        offset = int(offset_str)
+    except ValueError:
+        return None
+    # '+1_x' ou '01_x' ne sont jamais produits par l'analyseur
+    if str(offset) != offset_str or not name:
+        return None
+    return offset, name
+
+
+def _generate_node(tree: Dict, bound: Dict[str, str], lines: List[str], indent: int, counter: List[int]):
+    """Générer récursivement le code d'un nœud (if/else sur variables locales)"""
+    pad = "    " * indent
+    if 'label' in tree:
+        lines.append(f"{pad}return {bool(tree['label'])!r}")
+        return
+
+    attribute_name = tree['attribute']
+    threshold = float(tree.get('value', 0.5))
+
+    # Lecture paresseuse : l'attribut n'est lu qu'à sa première utilisation sur le chemin
+    bound = dict(bound)
+    if attribute_name not in bound:
+        var = f"a{counter[0]}"
+        counter[0] += 1
+        lines.append(f"{pad}{var} = get({attribute_name!r}, 0)")
+        bound[attribute_name] = var
+
+    lines.append(f"{pad}if {bound[attribute_name]} >= {threshold!r}:")
+    _generate_node(tree['gt'], bound, lines, indent + 1, counter)
+    lines.append(f"{pad}else:")
+    _generate_node(tree['lt'], bound, lines, indent + 1, counter)
+
+
+def generate_tree_source(tree: Dict, function_name: str) -> str:
+    """Traduire un arbre JSON en une fonction Python à plat"""
+    lines = [f"def {function_name}(attributes):", "    get = attributes.get"]
+    _generate_node(tree, {}, lines, 1, [0])
+    return "\n".join(lines) + "\n"
+
+
+def generate_module_source(rule_trees: Dict[str, Dict[str, Any]]) -> str:
+    """Générer le module complet (une fonction par arbre start/end)"""
+    parts = [GENERATED_HEADER, f"TREES_HASH = {trees_hash(rule_trees)!r}\n"]
+    table = []
+
+    for rule_name, trees in rule_trees.items():
+        entries = []
+        for kind in ('start', 'end'):
+            function_name = f"{rule_name}_{kind}"
+            parts.append("\n" + generate_tree_source(trees[kind], function_name))
+            entries.append(f"{kind!r}: {function_name}")
+        table.append(f"    {rule_name!r}: {{{', '.join(entries)}}},")
+
+    parts.append("\nRULES = {\n" + "\n".join(table) + "\n}\n")
+    return "".join(parts)
+
+
+def _load_module_from_path(path: str):
+    """Importer un module généré depuis le disque"""
+    spec = importlib.util.spec_from_file_location("compiled_rule_trees", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def compile_rule_trees(rule_trees: Dict[str, Dict[str, Any]],
+                       output_path: Optional[str] = None) -> Dict[str, Dict[str, Callable]]:
+    """Compiler les arbres en fonctions Python
+
+    Si ``output_path`` est donné, le module généré y est écrit et réutilisé
+    aux chargements suivants tant que les arbres n'ont pas changé.
+    """
+    expected_hash = trees_hash(rule_trees)
+
+    if output_path and os.path.exists(output_path):
+        module = _load_module_from_path(output_path)
+        if getattr(module, 'TREES_HASH', None) == expected_hash:
+            return module.RULES
+
+    source = generate_module_source(rule_trees)
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, output_path or "<rule_trees>", "exec"), namespace)
+    return namespace['RULES']
+
+
+def verify_against_interpreter(analyzer, quran_path: str = "quran-modified33.json",
+                               limit: Optional[int] = None) -> Dict[str, int]:
+    """Comparer arbres compilés et interpréteur sur chaque codepoint du corpus"""
+    with open(quran_path, 'r', encoding='utf-8') as f:
+        surahs = json.load(f)
+
+    compiled = compile_rule_trees(analyzer.rule_trees)
+    checked, mismatches, verses = 0, 0, 0
+
+    for surah in surahs:
+        for ayah in surah['ayahs']:
+            if limit is not None and verses >= limit:
+                return {'verses': verses, 'checked': checked, 'mismatches': mismatches}
+            verses += 1
+
+            text = analyzer._normalize_text(ayah['text'])
+            for position in range(len(text)):
+                for rule_name, trees in analyzer.rule_trees.items():
+                    context_attrs = analyzer._get_context_attributes(text, position, rule_name)
+                    for kind in ('start', 'end'):
+                        expected = analyzer._evaluate_tree(trees[kind], context_attrs)
+                        actual = compiled[rule_name][kind](context_attrs)
+                        checked += 1
+                        if expected != actual:
+                            mismatches += 1
+                            print(f"❌ {surah['number']}:{ayah['numberInSurah']} "
+                                  f"position {position} {rule_name}.{kind}")
+
+    return {'verses': verses, 'checked': checked, 'mismatches': mismatches}
+
+
+def main():
+    import argparse
+    from rule_tajwid import QuranTajweedAnalyzer
+
+    parser = argparse.ArgumentParser(description="Compiler les arbres rule_trees/ en module Python")
+    parser.add_argument("--trees-dir", default="rule_trees")
+    parser.add_argument("--output", default="compiled_rule_trees.py",
+                        help="Chemin du module généré")
+    parser.add_argument("--verify", metavar="QURAN_JSON",
+                        help="Vérifier l'égalité avec l'interpréteur sur ce corpus")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Nombre maximal de versets à vérifier")
+    args = parser.parse_args()
+
+    analyzer = QuranTajweedAnalyzer(args.trees_dir, compiled=False)
+    compile_rule_trees(analyzer.rule_trees, args.output)
+    print(f"🌳 {len(analyzer.rule_trees)} règles compilées dans {args.output}")
+
+    if args.verify:
+        report = verify_against_interpreter(analyzer, args.verify, args.limit)
+        print(f"📊 Versets: {report['verses']} | Évaluations: {report['checked']} "
+              f"| Divergences: {report['mismatches']}")
+        if report['mismatches']:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
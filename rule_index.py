@@ -0,0 +1,173 @@
+import sys
+import json
+import mmap
+import struct
+from typing import Dict, List, Any, Optional
+
+# Format binaire (little-endian) :
+#   en-tête       : magic, version, nb règles, nb sourates, nb ayahs, nb annotations, taille des noms
+#   noms          : noms des règles en UTF-8 séparés par '\n' (id = rang)
+#   sourates      : uint32[nb sourates + 1], premier ayah de chaque sourate (indexé par numéro)
+#   ayahs         : uint32[nb ayahs + 1], première annotation de chaque ayah
+#   débuts / fins : uint16[nb annotations] (segment [début, fin) en codepoints du texte normalisé)
+#   règles        : uint8[nb annotations]
+# Les annotations d'un ayah sont les segments de iter_rule_spans (arbres start
+# et end), triés par début.
+INDEX_MAGIC = b"TJIX"
+INDEX_VERSION = 2
+HEADER = struct.Struct("<4sHHHIII")
+
+
+def _pad(buffer: bytearray, alignment: int):
+    """Aligner la prochaine table sur la taille de ses éléments"""
+    buffer.extend(b"\0" * (-len(buffer) % alignment))
+
+
+def build_index(quran_path: str = "quran-modified33.json", output_path: str = "tajwid_index.bin",
+                trees_dir: str = "rule_trees") -> Dict[str, int]:
+    """Analyser tout le corpus une fois et écrire l'index binaire"""
+    from rule_tajwid import SimpleTajweedAnalyzer
+
+    if sys.byteorder != "little":
+        raise RuntimeError("L'index binaire suppose une machine little-endian")
+
+    with open(quran_path, 'r', encoding='utf-8') as f:
+        surahs = json.load(f)
+
+    analyzer = SimpleTajweedAnalyzer(trees_dir)
+    rule_names = list(analyzer.tree_analyzer.rule_trees)
+    rule_ids = {name: i for i, name in enumerate(rule_names)}
+
+    max_surah = max(surah['number'] for surah in surahs)
+    surah_table: List[Optional[int]] = [None] * (max_surah + 2)
+    ayah_table = [0]
+    starts, ends, rules = [], [], []
+
+    for surah in sorted(surahs, key=lambda s: s['number']):
+        surah_table[surah['number']] = len(ayah_table) - 1
+        for ayah in sorted(surah['ayahs'], key=lambda a: a['numberInSurah']):
+            spans = sorted((start, end, rule_ids[rule]) for rule, start, end in analyzer.iter_rule_spans(ayah['text']))
+            for start, end, rule_id in spans:
+                rules.append(rule_id)
+                starts.append(start)
+                ends.append(end)
+            ayah_table.append(len(rules))
+        surah_table[surah['number'] + 1] = len(ayah_table) - 1
+
+    # Sourates absentes : plage vide au même point que la suivante
+    for number in range(max_surah, -1, -1):
+        if surah_table[number] is None:
+            surah_table[number] = surah_table[number + 1]
+
+    names = "\n".join(rule_names).encode('utf-8')
+    buffer = bytearray(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(rule_names), len(surah_table) - 1,
+                                   len(ayah_table) - 1, len(rules), len(names)))
+    buffer.extend(names)
+    _pad(buffer, 4)
+    buffer.extend(struct.pack(f"<{len(surah_table)}I", *surah_table))
+    buffer.extend(struct.pack(f"<{len(ayah_table)}I", *ayah_table))
+    buffer.extend(struct.pack(f"<{len(starts)}H", *starts))
+    buffer.extend(struct.pack(f"<{len(ends)}H", *ends))
+    buffer.extend(bytes(rules))
+
+    with open(output_path, 'wb') as f:
+        f.write(buffer)
+
+    return {'ayahs': len(ayah_table) - 1, 'annotations': len(rules), 'bytes': len(buffer)}
+
+
+class TajweedIndex:
+    """Lecture de l'index binaire par memory-map (ni arbres ni JSON chargés)"""
+
+    def __init__(self, path: str = "tajwid_index.bin"):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_rules, n_surahs, n_ayahs, n_records, names_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Index Tajwid invalide ou de version inconnue: {path}")
+
+        offset = HEADER.size
+        self.rule_names = self._mmap[offset:offset + names_size].decode('utf-8').split("\n")[:n_rules]
+        offset += names_size
+        offset += -offset % 4
+
+        view = memoryview(self._mmap)
+        self._surahs = view[offset:offset + 4 * (n_surahs + 1)].cast('I')
+        offset += 4 * (n_surahs + 1)
+        self._ayahs = view[offset:offset + 4 * (n_ayahs + 1)].cast('I')
+        offset += 4 * (n_ayahs + 1)
+        self._starts = view[offset:offset + 2 * n_records].cast('H')
+        offset += 2 * n_records
+        self._ends = view[offset:offset + 2 * n_records].cast('H')
+        offset += 2 * n_records
+        self._rules = view[offset:offset + n_records]
+
+    def __len__(self) -> int:
+        return len(self._ayahs) - 1
+
+    def ayah_count(self, surah: int) -> int:
+        """Nombre d'ayahs d'une sourate (0 si absente)"""
+        if not 0 <= surah < len(self._surahs) - 1:
+            return 0
+        return self._surahs[surah + 1] - self._surahs[surah]
+
+    def annotations(self, surah: int, ayah: int) -> List[Dict[str, Any]]:
+        """Segments (règle, début, fin exclusive) d'un ayah en O(1)"""
+        if not 1 <= ayah <= self.ayah_count(surah):
+            raise KeyError(f"{surah}:{ayah}")
+
+        ayah_index = self._surahs[surah] + ayah - 1
+        first, last = self._ayahs[ayah_index], self._ayahs[ayah_index + 1]
+        return [
+            {'rule': self.rule_names[self._rules[i]], 'start': self._starts[i], 'end': self._ends[i]}
+            for i in range(first, last)
+        ]
+
+    def close(self):
+        """Libérer le memory-map et le fichier"""
+        for name in ('_surahs', '_ayahs', '_starts', '_ends', '_rules'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index binaire des annotations Tajwid du Coran")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Analyser le corpus et écrire l'index")
+    build.add_argument("--quran", default="quran-modified33.json")
+    build.add_argument("--output", default="tajwid_index.bin")
+    build.add_argument("--trees-dir", default="rule_trees")
+
+    show = subparsers.add_parser("show", help="Afficher les annotations d'un ayah (sourate:ayah)")
+    show.add_argument("reference")
+    show.add_argument("--index", default="tajwid_index.bin")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        report = build_index(args.quran, args.output, args.trees_dir)
+        print(f"📦 Index écrit: {args.output}")
+        print(f"   Ayahs: {report['ayahs']} | Annotations: {report['annotations']} | Taille: {report['bytes']} octets")
+    else:
+        surah, ayah = (int(part) for part in args.reference.split(":"))
+        with TajweedIndex(args.index) as index:
+            print(json.dumps(index.annotations(surah, ayah), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+from rule_tajwid import QuranTajweedAnalyzer, SimpleTajweedAnalyzer
+from ndjson_writer import iter_ayahs
+
+# Pseudo-règle des attributs communs (construits une fois par position, mode non paresseux)
+BASE_ATTRIBUTES = "(base)"
+# Pseudo-attributs : construction complète des attributs communs / propres à une règle (mode non paresseux)
+COMMON_ATTRIBUTES = "(communs)"
+RULE_SPECIFIC_ATTRIBUTES = "(propres)"
+
+
+class _RecordingAttributes:
+    """Attributs vus par un arbre compilé, mémorisés pour rejouer son chemin"""
+
+    __slots__ = ('attributes', 'values')
+
+    def __init__(self, attributes):
+        self.attributes = attributes
+        self.values: Dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.attributes.get(key, default)
+        self.values[key] = value
+        return value
+
+
+class RuleProfile:
+    """Compteurs accumulés pendant un profilage
+
+    Pour chaque (règle, arbre), ``paths`` associe un chemin racine -> feuille
+    (suite de nœuds 'attribut>=seuil' ou 'attribut<seuil') à [évaluations,
+    temps propre en ns]. Le temps propre exclut le calcul des attributs,
+    compté à part par attribut et par règle.
+    """
+
+    def __init__(self):
+        self.paths: Dict[Tuple[str, str], Dict[tuple, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self.attributes: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+        self.verses = 0
+        self.characters = 0
+        self.wall_ns = 0
+
+    def record_path(self, rule: str, kind: str, path: tuple, elapsed_ns: int):
+        entry = self.paths[(rule, kind)][path]
+        entry[0] += 1
+        entry[1] += elapsed_ns
+
+    def record_attribute(self, rule: str, name: str, elapsed_ns: int):
+        entry = self.attributes[(rule, name)]
+        entry[0] += 1
+        entry[1] += elapsed_ns
+
+    def rule_rows(self) -> List[Dict[str, Any]]:
+        """Une ligne par règle, triée par temps total décroissant"""
+        rows: Dict[str, Dict[str, Any]] = {}
+
+        def row(rule: str) -> Dict[str, Any]:
+            if rule not in rows:
+                rows[rule] = {'rule': rule, 'start_evaluations': 0, 'end_evaluations': 0,
+                              'node_visits': 0, 'evaluation_ns': 0, 'attribute_ns': 0}
+            return rows[rule]
+
+        for (rule, kind), paths in self.paths.items():
+            current = row(rule)
+            for path, (count, elapsed_ns) in paths.items():
+                current[f'{kind}_evaluations'] += count
+                # Nœuds internes du chemin + feuille
+                current['node_visits'] += count * (len(path) + 1)
+                current['evaluation_ns'] += elapsed_ns
+
+        for (rule, _), (_, elapsed_ns) in self.attributes.items():
+            row(rule)['attribute_ns'] += elapsed_ns
+
+        for current in rows.values():
+            evaluations = current['start_evaluations'] + current['end_evaluations']
+            current['total_ns'] = current['evaluation_ns'] + current['attribute_ns']
+            current['mean_depth'] = round(current['node_visits'] / evaluations - 1, 2) if evaluations else 0.0
+
+        return sorted(rows.values(), key=lambda current: current['total_ns'], reverse=True)
+
+    def attribute_rows(self) -> List[Dict[str, Any]]:
+        """Une ligne par attribut (toutes règles confondues), triée par temps décroissant"""
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for (_, name), (count, elapsed_ns) in self.attributes.items():
+            totals[name][0] += count
+            totals[name][1] += elapsed_ns
+
+        rows = [
+            {'attribute': name, 'computations': count, 'total_ns': elapsed_ns,
+             'mean_ns': round(elapsed_ns / count, 1) if count else 0.0}
+            for name, (count, elapsed_ns) in totals.items()
+        ]
+        return sorted(rows, key=lambda current: current['total_ns'], reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'verses': self.verses,
+            'characters': self.characters,
+            'wall_seconds': round(self.wall_ns / 1e9, 3),
+            'rules': self.rule_rows(),
+            'attributes': self.attribute_rows(),
+        }
+
+    def format_report(self, top: Optional[int] = None) -> str:
+        """Rapport texte : règles puis attributs, les plus coûteux en premier"""
+        rules = self.rule_rows()
+        attributes = self.attribute_rows()
+        total_ns = sum(current['total_ns'] for current in rules) or 1
+
+        lines = [
+            f"📊 {self.verses} versets, {self.characters} caractères, {self.wall_ns / 1e9:.2f} s",
+            "",
+            f"{'Règle':<22} {'start':>9} {'end':>8} {'nœuds':>10} {'prof.':>6} "
+            f"{'arbre ms':>9} {'attr. ms':>9} {'total ms':>9} {'%':>6}",
+        ]
+        for current in rules[:top]:
+            lines.append(
+                f"{current['rule']:<22} {current['start_evaluations']:>9} {current['end_evaluations']:>8} "
+                f"{current['node_visits']:>10} {current['mean_depth']:>6} "
+                f"{current['evaluation_ns'] / 1e6:>9.1f} {current['attribute_ns'] / 1e6:>9.1f} "
+                f"{current['total_ns'] / 1e6:>9.1f} {100 * current['total_ns'] / total_ns:>5.1f}%"
+            )
+
+        lines += ["", f"{'Attribut':<28} {'calculs':>10} {'total ms':>9} {'moy. ns':>9}"]
+        for current in attributes[:top]:
+            lines.append(
+                f"{current['attribute']:<28} {current['computations']:>10} "
+                f"{current['total_ns'] / 1e6:>9.1f} {current['mean_ns']:>9}"
+            )
+        return "\n".join(lines)
+
+    def collapsed_stacks(self, weight: str = "time") -> List[str]:
+        """Piles repliées 'règle;arbre;nœud;...;feuille poids' (flamegraph.pl, speedscope)
+
+        ``weight`` vaut 'time' (microsecondes) ou 'visits' (évaluations). Le
+        calcul des attributs apparaît sous 'règle;attributs;nom'.
+        """
+        if weight not in ("time", "visits"):
+            raise ValueError(f"Poids inconnu: {weight}")
+        index = 1 if weight == "time" else 0
+        scale = 1000 if weight == "time" else 1
+
+        lines = []
+        for (rule, kind), paths in sorted(self.paths.items()):
+            for path, entry in sorted(paths.items()):
+                value = entry[index] // scale
+                if value:
+                    lines.append(";".join((rule, kind) + path) + f" {value}")
+        for (rule, name), entry in sorted(self.attributes.items()):
+            value = entry[index] // scale
+            if value:
+                lines.append(f"{rule};attributs;{name} {value}")
+        return lines
+
+
+class ProfilingQuranTajweedAnalyzer(QuranTajweedAnalyzer):
+    """QuranTajweedAnalyzer instrumenté : chemins parcourus, temps par arbre et par attribut
+
+    Les arbres sont évalués comme d'habitude (compilés ou interprétés) ; le
+    chemin suivi est ensuite rejoué sur l'arbre JSON avec les valeurs lues,
+    hors chronométrage. L'instrumentation ralentit l'analyse : les temps
+    servent à comparer règles et attributs entre eux. Un profil n'est pas
+    prévu pour être partagé entre threads.
+    """
+
+    def __init__(self, *args, profile: Optional[RuleProfile] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profile = profile if profile is not None else RuleProfile()
+        # Temps d'attributs cumulé, pour le déduire du temps propre des arbres (mode paresseux)
+        self._attribute_ns = 0
+
+    def _tree_path(self, tree: Dict, values: Dict[str, Any]) -> tuple:
+        """Nœuds traversés par l'évaluation (même logique que _evaluate_tree)"""
+        path = []
+        while 'label' not in tree:
+            attribute_name = tree['attribute']
+            threshold = tree.get('value', 0.5)
+            value = values.get(attribute_name, 0)
+            if isinstance(value, bool):
+                value = 1.0 if value else 0.0
+            if value >= threshold:
+                path.append(f"{attribute_name}>={threshold}")
+                tree = tree['gt']
+            else:
+                path.append(f"{attribute_name}<{threshold}")
+                tree = tree['lt']
+        return tuple(path)
+
+    def _evaluate_rule(self, rule_name: str, kind: str, attributes: Dict) -> bool:
+        recorder = _RecordingAttributes(attributes)
+        attribute_before = self._attribute_ns
+        started = time.perf_counter_ns()
+        result = super()._evaluate_rule(rule_name, kind, recorder)
+        elapsed_ns = time.perf_counter_ns() - started - (self._attribute_ns - attribute_before)
+
+        path = self._tree_path(self.rule_trees[rule_name][kind], recorder.values)
+        self.profile.record_path(rule_name, kind, path, elapsed_ns)
+        return result
+
+    def _record_attribute(self, rule: str, name: str, elapsed_ns: int):
+        self._attribute_ns += elapsed_ns
+        self.profile.record_attribute(rule, name, elapsed_ns)
+
+    # Les méthodes de l'analyseur sont appelées telles quelles et seulement
+    # chronométrées : le profil mesure toujours le code réellement exécuté
+
+    def _compute_attribute(self, text: str, position: int, name: str, rule: str, group: tuple) -> Any:
+        started = time.perf_counter_ns()
+        value = super()._compute_attribute(text, position, name, rule, group)
+        self._record_attribute(rule, name, time.perf_counter_ns() - started)
+        return value
+
+    def _build_base_attributes(self, text: str, position: int) -> Dict[str, Any]:
+        started = time.perf_counter_ns()
+        attributes = super()._build_base_attributes(text, position)
+        self._record_attribute(BASE_ATTRIBUTES, COMMON_ATTRIBUTES, time.perf_counter_ns() - started)
+        return attributes
+
+    def _layer_rule_attributes(self, base: Dict[str, Any], rule: str) -> Dict[str, Any]:
+        started = time.perf_counter_ns()
+        attributes = super()._layer_rule_attributes(base, rule)
+        # Règle sans attribut propre : la base est rendue telle quelle, rien à compter
+        if attributes is not base:
+            self._record_attribute(rule, RULE_SPECIFIC_ATTRIBUTES, time.perf_counter_ns() - started)
+        return attributes
+
+
+def profile_corpus(quran_path: str = "quran-modified33.json", trees_dir: str = "rule_trees",
+                   mode: str = "verse", lazy: bool = True, compiled: bool = True,
+                   limit: Optional[int] = None) -> RuleProfile:
+    """Profiler l'analyse du corpus (ou de ses ``limit`` premiers ayahs)"""
+    tree_analyzer = ProfilingQuranTajweedAnalyzer(trees_dir, compiled=compiled, lazy=lazy)
+    analyzer = SimpleTajweedAnalyzer(trees_dir, tree_analyzer=tree_analyzer)
+    profile = tree_analyzer.profile
+
+    started = time.perf_counter_ns()
+    for index, (_, _, text) in enumerate(iter_ayahs(quran_path)):
+        if limit is not None and index >= limit:
+            break
+        if mode == "spans":
+            for _ in analyzer.iter_rule_spans(text):
+                pass
+        else:
+            analyzer.analyze_verse(text)
+        profile.verses += 1
+        profile.characters += len(text)
+    profile.wall_ns = time.perf_counter_ns() - started
+
+    return profile
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profil par règle : nœuds visités, temps des arbres et des attributs")
+    parser.add_argument("--quran", default="quran-modified33.json")
+    parser.add_argument("--trees-dir", default="rule_trees")
+    parser.add_argument("--mode", choices=["verse", "spans"], default="verse",
+                        help="analyze_verse (arbres 'start') ou iter_rule_spans ('start' et 'end')")
+    parser.add_argument("--eager", action="store_true", help="Attributs construits en entier (mode non paresseux)")
+    parser.add_argument("--interpreted", action="store_true", help="Arbres interprétés au lieu de compilés")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal d'ayahs")
+    parser.add_argument("--top", type=int, default=None, help="Lignes affichées par tableau")
+    parser.add_argument("--json", default=None, help="Écrire le rapport JSON dans ce fichier")
+    parser.add_argument("--collapsed", default=None, help="Écrire les piles repliées (flame graph) dans ce fichier")
+    parser.add_argument("--weight", choices=["time", "visits"], default="time",
+                        help="Poids des piles repliées : microsecondes ou évaluations")
+    args = parser.parse_args()
+
+    profile = profile_corpus(args.quran, args.trees_dir, args.mode, lazy=not args.eager,
+                             compiled=not args.interpreted, limit=args.limit)
+    print(profile.format_report(args.top))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Rapport JSON: {args.json}")
+
+    if args.collapsed:
+        with open(args.collapsed, 'w', encoding='utf-8') as f:
+            f.write("\n".join(profile.collapsed_stacks(args.weight)) + "\n")
+        print(f"🔥 Piles repliées: {args.collapsed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,188 +1,394 @@
 import re
 import json
-import unicodedata
-from typing import Dict, List, Any, Optional
+import time
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List, Any, Callable, Optional, Iterator, Tuple
 from collections import deque
+from functools import lru_cache
 
-class QuranTajweedAnalyzer:
-    """Analyseur Tajwid basé sur l'approche cpfair/quran-tajweed"""
+from rule_compiler import compile_rule_trees, parse_context_key
+from rule_bundle import BUNDLE_VERSION, load_bundle, bundle_rules
+from text_normalizer import QURAN_REPLACEMENTS, normalize, normalize_with_offsets, to_original_span
+from text_segmentation import VerseSegmentation, category, segment_verse
+from bounded_cache import BoundedLRUCache
+from compact_results import InternTable, CompactTreeResult
+from ndjson_writer import iter_ayahs, iter_verse_records, write_records
+from result_cache import content_version, code_fingerprint
+
+if TYPE_CHECKING:
+    from result_cache import VerseResultCache
+
+logger = logging.getLogger(__name__)
+
+# Attributs de position : nom -> fonction(texte, position, début du groupe, fin du groupe)
+POSITION_ATTRIBUTES = {
+    'position': lambda text, position, start_i, end_i: position,
+    'base_char': lambda text, position, start_i, end_i: text[start_i],
+    'char_group': lambda text, position, start_i, end_i: text[start_i:end_i],
+    'start_i': lambda text, position, start_i, end_i: start_i,
+    'end_i': lambda text, position, start_i, end_i: end_i,
+    'is_final_codepoint_in_letter': lambda text, position, start_i, end_i: position == end_i - 1,
+    'is_final_letter_in_ayah': lambda text, position, start_i, end_i: end_i >= len(text),
+    'is_base': lambda text, position, start_i, end_i: (
+        (category(text[position]) != "Mn" and text[position] != "ـ") or text[position] == "ٰ"
+    ),
+}
+
+# Attributs de diacritiques : vrai si le groupe contient l'un des caractères
+GROUP_ATTRIBUTES = {
+    'has_shaddah': 'ّ',
+    'has_sukun': 'ْ',
+    'has_tanween': 'ًٌٍ',
+    'has_maddah': 'ٓ',
+    'has_hamza': 'ؤئٕإأٔ',
+    'has_fathah': 'َ',
+    'has_dammah': 'ُ',
+    'has_kasrah': 'ِ',
+    'has_vowel_incl_tanween': 'ًٌٍَُِْ',
+    'has_explicit_sukoon': 'ْ۟',
+}
+
+# Attributs spécifiques aux règles : nom -> (type, caractères)
+#   'base'     : la lettre de base fait partie des caractères
+#   'group'    : le groupe contient l'un des caractères
+#   'no_group' : le groupe ne contient aucun des caractères
+RULE_ATTRIBUTES = {
+    'ghunnah': {
+        'is_noon_or_meem': ('base', 'نم'),
+        'base_is_heavy': ('base', 'هءحعخغ'),
+    },
+    'idghaam_ghunnah': {
+        'is_noon': ('base', 'ن'),
+        'is_tanween': ('base', 'ًٌٍ'),
+        'base_is_idghaam_ghunna_set': ('base', 'يمون'),
+        'has_implicit_sukoon': ('no_group', 'ًٌٍَُِْ'),
+    },
+    'ikhfa': {
+        'is_noon': ('base', 'ن'),
+        'is_tanween': ('base', 'ًٌٍ'),
+        'base_is_ikhfa_set': ('base', 'تثجدفقكطظضصشسذز'),
+        'has_implicit_sukoon': ('no_group', 'ًٌٍَُِْ'),
+    },
+    'iqlab': {
+        'is_tanween': ('base', 'ًٌٍ'),
+        'has_tanween': ('group', 'ًٌٍ'),
+        'has_small_meem': ('group', 'ۭۢ'),
+    },
+    'qalqalah': {
+        'is_muqalqalah': ('base', 'قطبجد'),
+    },
+    'madd_2': {
+        'is_dagger_alif': ('base', 'ٰ'),
+        'is_small_yeh': ('base', 'ۦ'),
+        'is_small_waw': ('base', 'ۥ'),
+    },
+    'madd_6': {
+        'is_hamza': ('base', 'ء'),
+        'is_alif': ('base', 'ا'),
+        'is_yeh': ('base', 'ي'),
+        'is_waw': ('base', 'و'),
+    },
+}
+
+class VerseAttributeCache:
+    """Cache des attributs d'un verset, partagé par toutes les règles
+
+    Les attributs de base sont construits une seule fois par position ; les
+    attributs spécifiques à une règle sont superposés une fois par
+    (position, règle). En mode paresseux, seules les valeurs demandées par
+    les arbres sont calculées et mémorisées. Le cache se vide dès qu'on
+    change de verset.
+    """
     
-    def __init__(self, trees_dir: str = "rule_trees"):
-        self.trees_dir = trees_dir
-        self.rule_trees = self._load_rule_trees()
-        self.context_sizes = self._get_context_sizes()
+    def __init__(self):
+        self.text = None
+        self._base = {}
+        self._layered = {}
+        self._groups = {}
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+        self.base_builds = 0
+        self.group_builds = 0
+    
+    def bind(self, text: str):
+        """Associer le cache à un verset (vidé si le texte change)"""
+        if text != self.text:
+            self.text = text
+            self._base.clear()
+            self._layered.clear()
+            self._groups.clear()
+            self._values.clear()
+    
+    def attributes(self, analyzer: 'QuranTajweedAnalyzer', text: str, position: int, rule: str) -> Dict[str, Any]:
+        """Attributs de la position pour la règle (à ne pas modifier par l'appelant)"""
+        if text is not self.text:
+            self.bind(text)
         
-    def _get_context_sizes(self) -> Dict[str, tuple]:
-        """Tailles de contexte pour chaque règle (lookbehind, lookahead)"""
+        # Les règles sans attributs propres partagent la même entrée
+        key = (position, rule if rule in RULE_ATTRIBUTES else None)
+        attributes = self._layered.get(key)
+        if attributes is not None:
+            self.hits += 1
+            return attributes
+        
+        self.misses += 1
+        base = self._base.get(position)
+        if base is None:
+            base = analyzer._build_base_attributes(text, position)
+            self._base[position] = base
+            self.base_builds += 1
+        
+        attributes = analyzer._layer_rule_attributes(base, rule)
+        self._layered[key] = attributes
+        return attributes
+    
+    def group(self, analyzer: 'QuranTajweedAnalyzer', text: str, position: int) -> tuple:
+        """Groupe de caractères de la position (un seul balayage par position)"""
+        if text is not self.text:
+            self.bind(text)
+        
+        group = self._groups.get(position)
+        if group is None:
+            group = analyzer._get_character_group(text, position)
+            self._groups[position] = group
+            self.group_builds += 1
+        return group
+    
+    def value(self, analyzer: 'QuranTajweedAnalyzer', text: str, position: int, name: str, rule: str) -> Any:
+        """Valeur d'un seul attribut, calculée à la première demande"""
+        if text is not self.text:
+            self.bind(text)
+        
+        # Les règles qui définissent l'attribut de la même façon partagent l'entrée
+        key = (position, name, RULE_ATTRIBUTES.get(rule, {}).get(name))
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+        
+        self.misses += 1
+        value = analyzer._compute_attribute(text, position, name, rule, self.group(analyzer, text, position))
+        self._values[key] = value
+        return value
+    
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs de hits/misses depuis la création du cache"""
+        calls = self.hits + self.misses
         return {
-            "ghunnah": (3, 1),
-            "hamzat_wasl": (1, 0),
-            "idghaam_ghunnah": (1, 3),
-            "idghaam_mutajanisayn": (0, 2),
-            "idghaam_mutaqaribayn": (1, 2),
-            "idghaam_no_ghunnah": (0, 3),
-            "idghaam_shafawi": (0, 2),
-            "ikhfa": (0, 3),
-            "ikhfa_shafawi": (0, 2),
-            "iqlab": (0, 2),
-            "lam_shamsiyyah": (1, 1),
-            "madd_2": (0, 1),
-            "madd_246": (1, 2),
-            "madd_6": (1, 1),
-            "madd_munfasil": (1, 2),
-            "madd_muttasil": (0, 3),
-            "qalqalah": (1, 1),
-            "silent": (0, 1),
-            "END": (1, 0)
+            'lookups': calls,
+            'hits': self.hits,
+            'misses': self.misses,
+            'base_builds': self.base_builds,
+            'group_builds': self.group_builds,
+            'hit_rate': self.hits / calls if calls else 0.0
         }
+
+class LazyContextAttributes:
+    """Attributs de contexte calculés à la demande, branche par branche
+
+    Se comporte comme le dict de _get_context_attributes pour ``get`` : seules
+    les clés atteignables par les arbres de la règle (``plan``) sont résolues,
+    et uniquement quand l'évaluation passe par le nœud correspondant.
+    """
     
-    def _load_rule_trees(self) -> Dict[str, Dict[str, Any]]:
-        """Charger les arbres de décision depuis les fichiers JSON"""
-        trees = {}
-        
-        # Règles supportées par cpfair/quran-tajweed
-        rules = [
-            'ghunnah', 'idghaam_ghunnah', 'idghaam_mutajanisayn', 
-            'idghaam_mutaqaribayn', 'idghaam_no_ghunnah', 'idghaam_shafawi',
-            'ikhfa', 'ikhfa_shafawi', 'iqlab', 'lam_shamsiyyah', 'madd_2',
-            'madd_246', 'madd_6', 'madd_munfasil', 'madd_muttasil', 
-            'qalqalah', 'silent', 'hamzat_wasl'
-        ]
+    __slots__ = ('analyzer', 'text', 'position', 'rule', 'plan', 'cache', 'in_rule')
+    
+    def __init__(self, analyzer: 'QuranTajweedAnalyzer', text: str, position: int, rule: str,
+                 plan: Dict[str, tuple], cache: Optional[VerseAttributeCache] = None,
+                 in_rule: Optional[Tuple[bool, List[bool]]] = None):
+        self.analyzer = analyzer
+        self.text = text
+        self.position = position
+        self.rule = rule
+        self.plan = plan
+        self.cache = cache
+        self.in_rule = in_rule
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self.plan.get(key)
+        if entry is None:
+            return default
         
-        for rule in rules:
-            try:
-                start_file = f"{self.trees_dir}/{rule}.start.json"
-                end_file = f"{self.trees_dir}/{rule}.end.json"
-                
-                with open(start_file, 'r', encoding='utf-8') as f:
-                    start_tree = json.load(f)
-                with open(end_file, 'r', encoding='utf-8') as f:
-                    end_tree = json.load(f)
-                
-                trees[rule] = {
-                    'start': start_tree,
-                    'end': end_tree
-                }
-            except FileNotFoundError:
-                print(f"⚠️ Arbres non trouvés pour: {rule}")
-                continue
-                
-        return trees
+        offset, name = entry
+        target = self.position + offset
+        in_text = 0 <= target < len(self.text)
+        
+        # 'exists' : vrai au caractère courant, faux hors du verset, absent sinon
+        if name == 'exists':
+            if offset == 0:
+                return True
+            return default if in_text else False
+        
+        if not in_text:
+            return default
+        
+        # 'in_rule' : état des segments ouverts, connu seulement pendant iter_rule_spans
+        if name == 'in_rule':
+            if self.in_rule is None or offset > 0:
+                return default
+            current, history = self.in_rule
+            return current if offset == 0 else history[target]
+        
+        return self.analyzer._attribute_value(self.text, target, name, self.rule, self.cache)
+
+class _Freezable:
+    """Attributs non réassignables après freeze() (analyseurs partagés)"""
     
-    def _normalize_text(self, text: str) -> str:
-        """Normaliser le texte comme dans cpfair/quran-tajweed"""
-        replacements = {
-            '۪': '', 'ۥ': '', 'ۖ': '', 'ۗ': '', 'ۘ': '', 'ۙ': '', 'ۚ': '', 'ۛ': '', 'ۜ': '',
-            'ٞ': '', 'ٰ': 'ا', 'ۦ': '', 'ۭ': '', '۫': '', '۬': '', '۩': '', 'ۨ': '', 'ۧ': '',
-            '۠': '', 'ۡ': 'ْ', 'ۢ': '', 'ۣ': '', 'ۤ': '', 'ۥ': '', 'ۦ': '', 'ۧ': '', 'ۨ': '',
-            '۩': '', '۪': '', '۫': '', '۬': '', 'ۭ': '', 'ۮ': '', 'ۯ': ''
-        }
+    def __setattr__(self, name: str, value: Any):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"{type(self).__name__} partagé en lecture seule : '{name}' non modifiable")
+        super().__setattr__(name, value)
+    
+    def freeze(self):
+        self._frozen = True
+
+class QuranTajweedAnalyzer(_Freezable):
+    """Analyseur Tajwid basé sur l'approche cpfair/quran-tajweed"""
+    
+    def __init__(self, trees_dir: str = "rule_trees", compiled: bool = True,
+                 compiled_module_path: Optional[str] = None, lazy: bool = True,
+                 bundle_path: Optional[str] = None,
+                 normalization_cache: Optional[BoundedLRUCache] = None):
+        self.trees_dir = trees_dir
+        # Cache de normalisation optionnel (BoundedLRUCache, partageable entre analyseurs)
+        self.normalization_cache = normalization_cache
         
-        normalized = unicodedata.normalize("NFC", text)
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
+        # Arbres, tailles de contexte et arbres compilés lus depuis un seul fichier
+        self.bundle = load_bundle(trees_dir, bundle_path)
+        self.rule_trees = self.bundle['rule_trees']
+        self.context_sizes = self.bundle['context_sizes']
+        self.tree_attributes = self.bundle['tree_attributes']
         
-        return normalized
+        # Attributs réellement atteignables par chaque arbre : calcul paresseux
+        self.lazy = lazy
+        self.context_plans = self._build_context_plans()
+        
+        # Arbres compilés en fonctions Python (None = interpréteur _evaluate_tree)
+        if not compiled:
+            self.compiled_trees = None
+        elif compiled_module_path:
+            self.compiled_trees = compile_rule_trees(self.rule_trees, compiled_module_path)
+        else:
+            self.compiled_trees = bundle_rules(self.bundle)
+        
+    def _build_context_plans(self) -> Dict[str, Dict[str, tuple]]:
+        """Clés '{offset}_{attribut}' des arbres que _get_context_attributes peut produire
+
+        Une clé hors de la fenêtre context_sizes de la règle, ou dont
+        l'attribut n'existe pas pour la règle, vaut toujours la valeur par
+        défaut : elle est écartée du plan.
+        """
+        plans = {}
+        for rule_name in self.rule_trees:
+            lookbehind, lookahead = self.context_sizes.get(rule_name, (1, 1))
+            available = set(POSITION_ATTRIBUTES) | set(GROUP_ATTRIBUTES) | set(RULE_ATTRIBUTES.get(rule_name, {}))
+            available.add('in_rule')
+            
+            plan = {}
+            for kind in ('start', 'end'):
+                for key in self.tree_attributes[rule_name][kind]:
+                    parsed = parse_context_key(key)
+                    if parsed is None:
+                        continue
+                    offset, name = parsed
+                    if -lookbehind <= offset <= lookahead and (name == 'exists' or name in available):
+                        plan[key] = parsed
+            plans[rule_name] = plan
+        return plans
+    
+    def context_window(self) -> Tuple[int, int]:
+        """Plus grande fenêtre (lookbehind, lookahead) parmi les règles chargées"""
+        sizes = [self.context_sizes.get(rule_name, (1, 1)) for rule_name in self.rule_trees]
+        return max((size[0] for size in sizes), default=0), max((size[1] for size in sizes), default=0)
+    
+    def _normalize_text(self, text: str) -> str:
+        """Normaliser le texte comme dans cpfair/quran-tajweed"""
+        if self.normalization_cache is None:
+            return normalize(text)
+        return self.normalization_cache.get_or_compute(('quran', text), lambda: normalize(text))
+    
+    def _normalize_with_offsets(self, text: str) -> Tuple[str, List[int]]:
+        """Texte normalisé et offsets d'origine (à ne pas modifier par l'appelant)"""
+        if self.normalization_cache is None:
+            return normalize_with_offsets(text)
+        return self.normalization_cache.get_or_compute(('quran_offsets', text),
+                                                       lambda: normalize_with_offsets(text))
     
     def _get_character_group(self, text: str, position: int) -> tuple:
         """Obtenir le groupe de caractères (base + diacritiques)"""
-        start_i = position
-        while (start_i > 0 and 
-               unicodedata.category(text[start_i]) == "Mn" and 
-               (text[start_i] != "ٰ" or text[start_i - 1] == "ـ")):
-            start_i -= 1
-        
-        end_i = start_i + 1
-        while (end_i < len(text) and 
-               unicodedata.category(text[end_i]) == "Mn" and 
-               text[end_i] != "ٰ"):
-            end_i += 1
-        
-        return start_i, end_i, text[start_i:end_i]
+        # Segmentation du verset faite une fois en O(n), puis lue par position
+        return segment_verse(text).group(position)
     
-    def _build_attributes(self, text: str, position: int, rule: str, include_this: bool = True) -> Dict[str, Any]:
-        """Construire les attributs pour l'arbre de décision"""
+    def _build_base_attributes(self, text: str, position: int) -> Dict[str, Any]:
+        """Attributs communs à toutes les règles (groupe + diacritiques)"""
         start_i, end_i, char_group = self._get_character_group(text, position)
-        base_char = text[start_i]
         
+        # Informations de base et attributs de position
         attributes = {
-            # Informations de base
-            'position': position,
-            'base_char': base_char,
-            'char_group': char_group,
-            'start_i': start_i,
-            'end_i': end_i,
-            
-            # Attributs de position
-            'is_final_codepoint_in_letter': position == end_i - 1,
-            'is_final_letter_in_ayah': end_i >= len(text),
-            'is_base': (unicodedata.category(text[position]) != "Mn" and text[position] != "ـ") or text[position] == "ٰ",
-            
-            # Diacritiques
-            'has_shaddah': 'ّ' in char_group,
-            'has_sukun': 'ْ' in char_group,
-            'has_tanween': any(t in char_group for t in 'ًٌٍ'),
-            'has_maddah': 'ٓ' in char_group,
-            'has_hamza': any(h in char_group for h in 'ؤئٕإأٔ'),
-            'has_fathah': 'َ' in char_group,
-            'has_dammah': 'ُ' in char_group,
-            'has_kasrah': 'ِ' in char_group,
-            'has_vowel_incl_tanween': any(v in char_group for v in 'ًٌٍَُِْ'),
-            'has_explicit_sukoon': '۟' in char_group or 'ْ' in char_group,
+            name: function(text, position, start_i, end_i)
+            for name, function in POSITION_ATTRIBUTES.items()
         }
         
-        # Attributs spécifiques aux règles
-        if rule == "ghunnah":
-            attributes.update({
-                'is_noon_or_meem': base_char in 'نم',
-                'base_is_heavy': base_char in 'هءحعخغ',
-            })
-        
-        elif rule == "idghaam_ghunnah":
-            attributes.update({
-                'is_noon': base_char == 'ن',
-                'is_tanween': base_char in 'ًٌٍ',
-                'base_is_idghaam_ghunna_set': base_char in 'يمون',
-                'has_implicit_sukoon': not any(s in char_group for s in 'ًٌٍَُِْ'),
-            })
-        
-        elif rule == "ikhfa":
-            attributes.update({
-                'is_noon': base_char == 'ن',
-                'is_tanween': base_char in 'ًٌٍ',
-                'base_is_ikhfa_set': base_char in 'تثجدفقكطظضصشسذز',
-                'has_implicit_sukoon': not any(s in char_group for s in 'ًٌٍَُِْ'),
-            })
-        
-        elif rule == "iqlab":
-            attributes.update({
-                'is_tanween': base_char in 'ًٌٍ',
-                'has_tanween': any(t in char_group for t in 'ًٌٍ'),
-                'has_small_meem': 'ۢ' in char_group or 'ۭ' in char_group,
-            })
-        
-        elif rule == "qalqalah":
-            attributes.update({
-                'is_muqalqalah': base_char in 'قطبجد',
-            })
-        
-        elif rule == "madd_2":
-            attributes.update({
-                'is_dagger_alif': base_char == 'ٰ',
-                'is_small_yeh': base_char == 'ۦ',
-                'is_small_waw': base_char == 'ۥ',
-            })
-        
-        elif rule == "madd_6":
-            attributes.update({
-                'is_hamza': base_char == 'ء',
-                'is_alif': base_char == 'ا',
-                'is_yeh': base_char == 'ي',
-                'is_waw': base_char == 'و',
-            })
+        # Diacritiques (le groupe contient l'un des caractères)
+        for name, chars in GROUP_ATTRIBUTES.items():
+            attributes[name] = any(c in char_group for c in chars)
+        
+        return attributes
+    
+    def _compute_attribute(self, text: str, position: int, name: str, rule: str, group: tuple) -> Any:
+        """Calculer un seul attribut (même valeur que dans _build_attributes)"""
+        start_i, end_i, char_group = group
+        
+        spec = RULE_ATTRIBUTES.get(rule, {}).get(name)
+        if spec is not None:
+            kind, chars = spec
+            if kind == 'base':
+                return text[start_i] in chars
+            elif kind == 'group':
+                return any(c in char_group for c in chars)
+            return not any(c in char_group for c in chars)
+        
+        chars = GROUP_ATTRIBUTES.get(name)
+        if chars is not None:
+            return any(c in char_group for c in chars)
+        
+        return POSITION_ATTRIBUTES[name](text, position, start_i, end_i)
+    
+    def _attribute_value(self, text: str, position: int, name: str, rule: str,
+                         cache: Optional['VerseAttributeCache'] = None) -> Any:
+        """Valeur d'un attribut à une position, via le cache du verset si fourni"""
+        if cache is not None:
+            return cache.value(self, text, position, name, rule)
+        return self._compute_attribute(text, position, name, rule,
+                                       self._get_character_group(text, position))
+    
+    def _layer_rule_attributes(self, base: Dict[str, Any], rule: str) -> Dict[str, Any]:
+        """Ajouter les attributs spécifiques à la règle (base inchangée si aucun)"""
+        extras = RULE_ATTRIBUTES.get(rule)
+        if not extras:
+            return base
+        
+        attributes = dict(base)
+        base_char, char_group = base['base_char'], base['char_group']
+        for name, (kind, chars) in extras.items():
+            if kind == 'base':
+                attributes[name] = base_char in chars
+            elif kind == 'group':
+                attributes[name] = any(c in char_group for c in chars)
+            else:
+                attributes[name] = not any(c in char_group for c in chars)
         
         return attributes
     
+    def _build_attributes(self, text: str, position: int, rule: str, include_this: bool = True,
+                          cache: Optional['VerseAttributeCache'] = None) -> Dict[str, Any]:
+        """Construire les attributs pour l'arbre de décision"""
+        if cache is not None:
+            return cache.attributes(self, text, position, rule)
+        
+        return self._layer_rule_attributes(self._build_base_attributes(text, position), rule)
+    
     def _evaluate_tree(self, tree: Dict, attributes: Dict) -> bool:
         """Évaluer un arbre de décision avec les attributs donnés"""
         if 'label' in tree:
@@ -202,7 +408,15 @@ class QuranTajweedAnalyzer:
         else:
             return self._evaluate_tree(tree['lt'], attributes)
     
-    def _get_context_attributes(self, text: str, position: int, rule: str) -> Dict[str, Any]:
+    def _evaluate_rule(self, rule_name: str, kind: str, attributes: Dict) -> bool:
+        """Évaluer l'arbre 'start' ou 'end' d'une règle (compilé si disponible)"""
+        if self.compiled_trees is not None:
+            return self.compiled_trees[rule_name][kind](attributes)
+        return self._evaluate_tree(self.rule_trees[rule_name][kind], attributes)
+    
+    def _get_context_attributes(self, text: str, position: int, rule: str,
+                                cache: Optional['VerseAttributeCache'] = None,
+                                in_rule: Optional[Tuple[bool, List[bool]]] = None) -> Dict[str, Any]:
         """Obtenir les attributs avec contexte (lookbehind + lookahead)"""
         lookbehind, lookahead = self.context_sizes.get(rule, (1, 1))
         context_attrs = {}
@@ -211,7 +425,7 @@ class QuranTajweedAnalyzer:
         for i in range(lookbehind, 0, -1):
             offset = -i
             if position + offset >= 0:
-                attrs = self._build_attributes(text, position + offset, rule, include_this=False)
+                attrs = self._build_attributes(text, position + offset, rule, include_this=False, cache=cache)
                 for key, value in attrs.items():
                     context_attrs[f"{offset}_{key}"] = value
             else:
@@ -219,7 +433,7 @@ class QuranTajweedAnalyzer:
                 context_attrs[f"{offset}_exists"] = False
         
         # Caractère courant
-        current_attrs = self._build_attributes(text, position, rule, include_this=True)
+        current_attrs = self._build_attributes(text, position, rule, include_this=True, cache=cache)
         for key, value in current_attrs.items():
             context_attrs[f"0_{key}"] = value
         context_attrs["0_exists"] = True
@@ -228,23 +442,40 @@ class QuranTajweedAnalyzer:
         for i in range(1, lookahead + 1):
             offset = i
             if position + offset < len(text):
-                attrs = self._build_attributes(text, position + offset, rule, include_this=False)
+                attrs = self._build_attributes(text, position + offset, rule, include_this=False, cache=cache)
                 for key, value in attrs.items():
                     context_attrs[f"{offset}_{key}"] = value
             else:
                 context_attrs[f"{offset}_exists"] = False
         
+        # État des segments ouverts (uniquement pendant iter_rule_spans)
+        if in_rule is not None:
+            current, history = in_rule
+            context_attrs["0_in_rule"] = current
+            for i in range(lookbehind, 0, -1):
+                if position - i >= 0:
+                    context_attrs[f"{-i}_in_rule"] = history[position - i]
+        
         return context_attrs
     
+    def _context_attributes(self, text: str, position: int, rule: str,
+                            cache: Optional[VerseAttributeCache] = None,
+                            in_rule: Optional[Tuple[bool, List[bool]]] = None):
+        """Attributs de contexte à passer aux arbres (paresseux ou dict complet)"""
+        if self.lazy:
+            return LazyContextAttributes(self, text, position, rule, self.context_plans[rule], cache, in_rule)
+        return self._get_context_attributes(text, position, rule, cache, in_rule)
+    
     # --- MODIFIÉ ---
     # La sortie des règles est allégée (suppression de 'context' et 'confidence')
-    def analyze_character_with_trees(self, text: str, position: int) -> Dict[str, Any]:
+    def analyze_character_with_trees(self, text: str, position: int,
+                                     cache: Optional['VerseAttributeCache'] = None) -> Dict[str, Any]:
         """Analyser un caractère avec les arbres de décision"""
         detected_rules = []
         
-        for rule_name, trees in self.rule_trees.items():
-            context_attrs = self._get_context_attributes(text, position, rule_name)
-            start_detected = self._evaluate_tree(trees['start'], context_attrs)
+        for rule_name in self.rule_trees:
+            context_attrs = self._context_attributes(text, position, rule_name, cache)
+            start_detected = self._evaluate_rule(rule_name, 'start', context_attrs)
             
             if start_detected:
                 detected_rules.append({
@@ -261,79 +492,380 @@ class QuranTajweedAnalyzer:
             'total_rules': len(detected_rules)
         }
 
+    def iter_rule_spans(self, text: str,
+                        cache: Optional[VerseAttributeCache] = None) -> Iterator[Tuple[str, int, int]]:
+        """Produire les segments (règle, début, fin) dès qu'ils se ferment
+
+        Pour chaque règle, l'arbre 'start' ouvre un segment quand aucun n'est
+        ouvert, puis l'arbre 'end' le ferme (éventuellement à la même
+        position) ; ``fin`` est exclusive. Les arbres voient l'attribut
+        ``in_rule`` (segment ouvert à la position courante ou précédente).
+        Les espaces ne sont pas évalués, comme dans analyze_verse, et un
+        segment encore ouvert en fin de verset n'est pas émis.
+        """
+        if cache is None:
+            cache = VerseAttributeCache()
+        cache.bind(text)
+        
+        open_starts = {rule_name: None for rule_name in self.rule_trees}
+        histories = {rule_name: [False] * len(text) for rule_name in self.rule_trees}
+        
+        for position, char in enumerate(text):
+            for rule_name, history in histories.items():
+                if char.isspace():
+                    history[position] = open_starts[rule_name] is not None
+                    continue
+                
+                if open_starts[rule_name] is None:
+                    context_attrs = self._context_attributes(text, position, rule_name, cache, (False, history))
+                    if self._evaluate_rule(rule_name, 'start', context_attrs):
+                        open_starts[rule_name] = position
+                
+                if open_starts[rule_name] is not None:
+                    history[position] = True
+                    context_attrs = self._context_attributes(text, position, rule_name, cache, (True, history))
+                    if self._evaluate_rule(rule_name, 'end', context_attrs):
+                        yield rule_name, open_starts[rule_name], position + 1
+                        open_starts[rule_name] = None
+
+def _record_stage(timings: Dict[str, float], stage: str, started: float) -> float:
+    """Ajouter la durée d'une étape ; retourne l'instant de fin (début de l'étape suivante)"""
+    now = time.perf_counter()
+    timings[stage] = now - started
+    return now
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """Longueur du plus long préfixe commun (comparaisons de tranches par dichotomie)"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def _common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Longueur du plus long suffixe commun, au plus ``limit``"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+@lru_cache(maxsize=None)
+def _analysis_code_fingerprint() -> str:
+    """Empreinte du code qui produit un résultat (calculée une fois par processus)"""
+    return code_fingerprint(
+        *POSITION_ATTRIBUTES.values(), normalize, normalize_with_offsets,
+        VerseSegmentation.__init__, VerseSegmentation.group,
+        QuranTajweedAnalyzer._build_base_attributes, QuranTajweedAnalyzer._compute_attribute,
+        QuranTajweedAnalyzer._layer_rule_attributes, QuranTajweedAnalyzer._get_context_attributes,
+        QuranTajweedAnalyzer.analyze_character_with_trees,
+        SimpleTajweedAnalyzer._verse_entry, SimpleTajweedAnalyzer._generate_comprehensive_stats,
+        SimpleTajweedAnalyzer._assess_quality
+    )
+
 # --- Classe simplifiée (Arbres uniquement) ---
 
-class SimpleTajweedAnalyzer:
+class SimpleTajweedAnalyzer(_Freezable):
     """Analyseur simplifié utilisant UNIQUEMENT les arbres de décision"""
     
-    def __init__(self, trees_dir: str = "rule_trees"):
-        self.tree_analyzer = QuranTajweedAnalyzer(trees_dir)
+    def __init__(self, trees_dir: str = "rule_trees", compiled: bool = True,
+                 backend: str = "python", lazy: bool = True,
+                 normalization_cache: Optional[BoundedLRUCache] = None,
+                 result_cache: Optional['VerseResultCache'] = None,
+                 tree_analyzer: Optional[QuranTajweedAnalyzer] = None):
+        # ``tree_analyzer`` permet de fournir une variante (ex. rule_profiler)
+        self.tree_analyzer = tree_analyzer or QuranTajweedAnalyzer(trees_dir, compiled=compiled, lazy=lazy,
+                                                                   normalization_cache=normalization_cache)
+        
+        # Cache persistant des résultats (clé : texte normalisé + version des
+        # arbres, des tables d'attributs, de la normalisation et du code d'analyse)
+        self.result_cache = result_cache
+        self.cache_version = content_version(
+            BUNDLE_VERSION, self.tree_analyzer.bundle['trees_hash'], self.tree_analyzer.context_sizes,
+            RULE_ATTRIBUTES, GROUP_ATTRIBUTES, QURAN_REPLACEMENTS, _analysis_code_fingerprint()
+        )
+        # (règle, méthode) internées une fois pour tous les résultats compacts
+        self.result_table = InternTable()
+        
+        # Callbacks de chronométrage par étape (voir add_timing_hook)
+        self.timing_hooks: List[Callable[[str, Dict[str, float]], None]] = []
+        
+        # Backend 'numpy' : évaluation vectorisée de tout le verset (NumPy requis)
+        if backend == "numpy":
+            from rule_vectorized import VectorizedTreeEvaluator
+            self.vectorized = VectorizedTreeEvaluator(self.tree_analyzer)
+        elif backend == "python":
+            self.vectorized = None
+        else:
+            raise ValueError(f"Backend inconnu: {backend}")
     
-    def analyze_character(self, text: str, position: int) -> Dict[str, Any]:
+    def iter_rule_spans(self, verse: str, original: bool = False) -> Iterator[Tuple[str, int, int]]:
+        """Segments (règle, début, fin) du verset normalisé, émis au fil de l'eau
+
+        Avec ``original=True``, début et fin sont des offsets dans le texte
+        Uthmani d'origine (celui affiché à l'apprenant).
+        """
+        verse_normalized, offsets = self._normalize_verse(verse, original)
+        
+        if self.vectorized is not None:
+            spans = self.vectorized.iter_rule_spans(verse_normalized)
+        else:
+            spans = self.tree_analyzer.iter_rule_spans(verse_normalized)
+        
+        if not original:
+            return spans
+        return ((rule, *to_original_span(offsets, start, end)) for rule, start, end in spans)
+    
+    def analyze_character(self, text: str, position: int,
+                          cache: Optional[VerseAttributeCache] = None) -> Dict[str, Any]:
         """Analyse un caractère en utilisant les arbres de décision"""
-        tree_result = self.tree_analyzer.analyze_character_with_trees(text, position)
+        tree_result = self.tree_analyzer.analyze_character_with_trees(text, position, cache)
         return tree_result
     
     # --- MODIFIÉ ---
     # Construit une liste JSON propre pour la sortie
-    def analyze_verse(self, verse: str) -> Dict[str, Any]:
-        """Analyser un verset complet et retourner un rapport structuré"""
-        print("🔍 Démarrage de l'analyse Tajwid...")
-        print("🌳 Utilisation des arbres de décision cpfair/quran-tajweed (uniquement)")
-        print("-" * 60)
+    def analyze_verse(self, verse: str, cache: Optional[VerseAttributeCache] = None,
+                      original_positions: bool = False) -> Dict[str, Any]:
+        """Analyser un verset complet et retourner un rapport structuré
+
+        ``cache`` permet de récupérer les compteurs du cache d'attributs ;
+        un cache neuf est utilisé pour chaque verset sinon. Avec
+        ``original_positions=True``, chaque entrée reçoit aussi
+        'original_position' (offset dans le texte Uthmani d'origine).
+        """
+        logger.debug("Analyse Tajwid (arbres de décision cpfair/quran-tajweed): %s", verse)
+        
+        # Chronométrage par étape seulement si des hooks sont attachés
+        timings = {} if self.timing_hooks else None
+        if timings is not None:
+            started = time.perf_counter()
         
         analysis_results_raw = [] # Résultats bruts pour les statistiques
         methods_used = set()
         
-        verse_normalized = self.tree_analyzer._normalize_text(verse)
+        verse_normalized, offsets = self._normalize_verse(verse, original_positions)
+        if timings is not None:
+            started = _record_stage(timings, 'normalize', started)
         
-        i = 0
-        while i < len(verse_normalized):
-            if verse_normalized[i].isspace():
-                i += 1
-                continue
-            
-            # 1. Obtenir l'analyse de base (allégée)
-            analysis_raw = self.analyze_character(verse_normalized, i)
-            analysis_results_raw.append(analysis_raw)
+        # Résultat déjà calculé pour ce texte normalisé : seuls le texte
+        # d'origine et ses offsets sont propres à cet appel
+        if self.result_cache is not None:
+            result_key = self.result_cache.key(type(self).__name__, self.cache_version, verse_normalized)
+            cached = self.result_cache.get(result_key)
+            if cached is not None:
+                cached['verse'] = verse
+                if offsets is not None:
+                    self._set_original_positions(cached['analysis'], offsets)
+                if timings is not None:
+                    _record_stage(timings, 'cache', started)
+                    self._emit_timings(verse, timings)
+                return cached
+        
+        # Groupes de caractères du verset, calculés une fois
+        segment_verse(verse_normalized)
+        if timings is not None:
+            started = _record_stage(timings, 'segment', started)
+        
+        if self.vectorized is not None:
+            # 1. Toutes les positions évaluées d'un coup (backend NumPy)
+            analysis_results_raw = self.vectorized.analyze_text(verse_normalized)
+        else:
+            if cache is None:
+                cache = VerseAttributeCache()
+            cache.bind(verse_normalized)
             
+            i = 0
+            while i < len(verse_normalized):
+                if verse_normalized[i].isspace():
+                    i += 1
+                    continue
+                
+                # 1. Obtenir l'analyse de base (allégée)
+                analysis_raw = self.analyze_character(verse_normalized, i, cache)
+                analysis_results_raw.append(analysis_raw)
+                i += 1
+        if timings is not None:
+            started = _record_stage(timings, 'evaluate', started)
+        
+        for analysis_raw in analysis_results_raw:
             for rule in analysis_raw['rules']:
                 methods_used.add(rule['method'])
-            
-            i += 1
         
         # 2. Générer le rapport statistique
         stats = self._generate_comprehensive_stats(analysis_results_raw)
 
         # 3. Créer la sortie JSON propre
-        json_output_list = []
-        for analysis_raw in analysis_results_raw:
-            # Obtenir les infos du groupe
-            char_info = self.tree_analyzer._get_character_group(
-                verse_normalized,
-                analysis_raw['position']
-            )
-            
-            json_output_list.append({
-                'position': analysis_raw['position'],
-                'character': analysis_raw['character'],
-                'group': char_info[2], # Le groupe de caractères
-                'base_char': char_info[2][0] if char_info[2] else '', # La lettre de base
-                'rules': analysis_raw['rules'] # Utilise les règles déjà allégées
-            })
+        json_output_list = [
+            self._verse_entry(verse_normalized, analysis_raw)
+            for analysis_raw in analysis_results_raw
+        ]
 
         # 4. Modifier le retour de la fonction
-        return {
+        result = {
             'verse': verse,
             'verse_normalized': verse_normalized, 
             'analysis': json_output_list, # Clé contenant notre liste JSON
             'statistics': stats,
             'methods_used': list(methods_used)
         }
+        if timings is not None:
+            _record_stage(timings, 'stats', started)
+        if self.result_cache is not None:
+            # Stocké sans offsets d'origine (propres au texte de chaque appel)
+            self.result_cache.put(result_key, result)
+        if offsets is not None:
+            self._set_original_positions(json_output_list, offsets)
+        if timings is not None:
+            self._emit_timings(verse, timings)
+        return result
+    
+    def add_timing_hook(self, hook: Callable[[str, Dict[str, float]], None]):
+        """Recevoir, pour chaque verset, la durée en secondes de chaque étape
+
+        ``hook(verse, timings)`` reçoit les étapes 'normalize', 'segment',
+        'evaluate' et 'stats' (ou 'normalize' et 'cache' si le résultat vient
+        du cache de résultats). Sans hook, rien n'est chronométré.
+        Refusé sur un analyseur figé (get_shared_analyzer).
+        """
+        if self.__dict__.get('_frozen'):
+            raise AttributeError("Analyseur partagé en lecture seule : créer un SimpleTajweedAnalyzer pour ajouter des hooks")
+        self.timing_hooks.append(hook)
+    
+    def remove_timing_hook(self, hook: Callable[[str, Dict[str, float]], None]):
+        self.timing_hooks.remove(hook)
+    
+    def freeze(self):
+        """Figer l'analyseur et son analyseur d'arbres (hooks et attributs en lecture seule)"""
+        self.timing_hooks = ()
+        self.tree_analyzer.freeze()
+        super().freeze()
+    
+    def _emit_timings(self, verse: str, timings: Dict[str, float]):
+        for hook in self.timing_hooks:
+            hook(verse, timings)
+    
+    def analyze_verse_compact(self, verse: str, cache: Optional[VerseAttributeCache] = None,
+                              original_positions: bool = False) -> CompactTreeResult:
+        """Même analyse que analyze_verse, stockée en tableaux (to_dict() pour la forme habituelle)"""
+        return CompactTreeResult.from_result(self, self.result_table,
+                                             self.analyze_verse(verse, cache, original_positions))
+    
+    def _normalize_verse(self, verse: str, original_positions: bool) -> Tuple[str, Optional[List[int]]]:
+        """Texte normalisé, et offsets d'origine seulement s'ils sont demandés (calcul ~6x plus lent)"""
+        if original_positions:
+            return self.tree_analyzer._normalize_with_offsets(verse)
+        return self.tree_analyzer._normalize_text(verse), None
+    
+    @staticmethod
+    def _set_original_positions(entries: List[Dict[str, Any]], offsets: Optional[List[int]]):
+        """Renseigner 'original_position' de chaque entrée (retiré si ``offsets`` vaut None)"""
+        for entry in entries:
+            if offsets is None:
+                entry.pop('original_position', None)
+            else:
+                entry['original_position'] = offsets[entry['position']]
+    
+    def _verse_entry(self, verse_normalized: str, analysis_raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Entrée JSON d'un caractère analysé"""
+        # Obtenir les infos du groupe
+        char_info = self.tree_analyzer._get_character_group(
+            verse_normalized,
+            analysis_raw['position']
+        )
+        
+        return {
+            'position': analysis_raw['position'],
+            'character': analysis_raw['character'],
+            'group': char_info[2], # Le groupe de caractères
+            'base_char': char_info[2][0] if char_info[2] else '', # La lettre de base
+            'rules': analysis_raw['rules'] # Utilise les règles déjà allégées
+        }
+    
+    def reanalyze_verse(self, previous: Dict[str, Any], start: int, end: int, replacement: str,
+                        cache: Optional[VerseAttributeCache] = None,
+                        original_positions: bool = False) -> Dict[str, Any]:
+        """Réanalyser un verset après une modification locale
+
+        ``previous`` est le résultat de analyze_verse avant modification et
+        ``previous['verse'][start:end]`` est remplacé par ``replacement``.
+        Seules les positions dont la fenêtre de contexte (context_sizes) ou
+        le groupe de caractères touche la zone modifiée sont réévaluées ; le
+        résultat est identique à celui de analyze_verse sur le nouveau texte
+        (avec le même ``original_positions``).
+        """
+        old_verse = previous['verse']
+        verse = old_verse[:start] + replacement + old_verse[end:]
+        old_normalized = previous['verse_normalized']
+        verse_normalized, offsets = self._normalize_verse(verse, original_positions)
+        length = len(verse_normalized)
+        
+        # Zone modifiée du texte normalisé : [prefix, length - suffix)
+        prefix = _common_prefix_length(old_normalized, verse_normalized)
+        suffix = _common_suffix_length(old_normalized, verse_normalized,
+                                       min(len(old_normalized), length) - prefix)
+        delta = length - len(old_normalized)
+        
+        segmentation = segment_verse(verse_normalized)
+        lookbehind, lookahead = self.tree_analyzer.context_window()
+        
+        # Les attributs d'une position q lisent les caractères [début du groupe - 1, fin du groupe] :
+        # une position est reprise si toute sa fenêtre lit une zone inchangée
+        def unchanged_before(position: int) -> bool:
+            last = position + lookahead
+            return last < prefix and segmentation.ends[last] + 1 <= prefix
+        
+        def unchanged_after(position: int) -> bool:
+            first = position - lookbehind
+            return first >= 0 and segmentation.starts[first] - 1 >= length - suffix
+        
+        # Balayage vers l'extérieur depuis la modification
+        first_changed = prefix
+        while first_changed > 0 and not unchanged_before(first_changed - 1):
+            first_changed -= 1
+        stop = length - suffix
+        while stop < length and not unchanged_after(stop):
+            stop += 1
+        
+        if cache is None:
+            cache = VerseAttributeCache()
+        cache.bind(verse_normalized)
+        
+        previous_entries = {entry['position']: entry for entry in previous['analysis']}
+        json_output_list = []
+        for position, char in enumerate(verse_normalized):
+            if char.isspace():
+                continue
+            if position < first_changed or position >= stop:
+                entry = previous_entries[position if position < first_changed else position - delta]
+                json_output_list.append(dict(entry, position=position))
+            else:
+                analysis_raw = self.analyze_character(verse_normalized, position, cache)
+                json_output_list.append(self._verse_entry(verse_normalized, analysis_raw))
+        self._set_original_positions(json_output_list, offsets)
+        
+        methods_used = set()
+        for entry in json_output_list:
+            for rule in entry['rules']:
+                methods_used.add(rule['method'])
+        
+        return {
+            'verse': verse,
+            'verse_normalized': verse_normalized,
+            'analysis': json_output_list,
+            'statistics': self._generate_comprehensive_stats(json_output_list),
+            'methods_used': list(methods_used)
+        }
     
     def _generate_comprehensive_stats(self, analysis_results: List[Dict]) -> Dict[str, Any]:
         """Générer des statistiques complètes"""
-        total_rules = sum(result['total_rules'] for result in analysis_results)
+        total_rules = sum(len(result['rules']) for result in analysis_results)
         total_chars = len(analysis_results)
         
         rules_by_type = {}
@@ -368,24 +900,84 @@ class SimpleTajweedAnalyzer:
         else:
             return "Aucune règle détectée"
 
+# --- Analyseur partagé par processus ---
+
+_SHARED_ANALYZERS: Dict[tuple, SimpleTajweedAnalyzer] = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_shared_analyzer(trees_dir: str = "rule_trees", backend: str = "python") -> SimpleTajweedAnalyzer:
+    """Analyseur unique par processus (et par configuration), construit au premier appel
+
+    L'analyseur ne garde aucun état entre deux versets (le cache d'attributs
+    est créé par appel) : il peut être partagé entre requêtes et threads. Il
+    est figé : ses attributs ne peuvent pas être réassignés et les hooks de
+    chronométrage sont refusés, pour qu'aucun appelant n'en change le
+    comportement pour les autres. Ses tables (arbres, plans) ne doivent pas
+    être modifiées non plus ; construire un SimpleTajweedAnalyzer pour une
+    configuration différente.
+    """
+    key = (trees_dir, backend)
+    analyzer = _SHARED_ANALYZERS.get(key)
+    if analyzer is None:
+        with _SHARED_LOCK:
+            analyzer = _SHARED_ANALYZERS.get(key)
+            if analyzer is None:
+                analyzer = SimpleTajweedAnalyzer(trees_dir, backend=backend)
+                analyzer.freeze()
+                _SHARED_ANALYZERS[key] = analyzer
+    return analyzer
+
 # 🎯 SCRIPT PRINCIPAL (MODIFIÉ POUR SORTIE JSON)
 def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Analyseur Tajwid (arbres de décision)")
+    parser.add_argument("--verse", default=None, help="Verset à analyser (défaut: Yusuf 12:28)")
+    parser.add_argument("--corpus", metavar="QURAN_JSON", default=None,
+                        help="Analyser tout le corpus (implique --ndjson)")
+    parser.add_argument("--ndjson", metavar="OUTPUT", default=None,
+                        help="Écrire un enregistrement NDJSON par ayah ou par segment ('-' = sortie standard)")
+    parser.add_argument("--gzip", action="store_true", help="Compresser la sortie NDJSON")
+    parser.add_argument("--mode", choices=["verse", "spans"], default="verse",
+                        help="Un enregistrement par ayah ou par segment de règle")
+    parser.add_argument("--verbose", action="store_true", help="Afficher les messages de débogage")
+    parser.add_argument("--timings", action="store_true", help="Afficher la durée de chaque étape de l'analyse")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+    
+    # Verset de test (Yusuf 12:28)
+    test_verse = args.verse or "فَلَمَّا ر۪ء۪ا قَمِيصَهُۥ قُدَّ مِن دُبُرٖ قَالَ إِنَّهُۥ مِن كَيْدِkُنَّ إِنَّ كَيْدَكُنَّ عَظِيمٞۖ"
+    
+    # Mode flux : rien n'est accumulé, chaque enregistrement est écrit dès qu'il est produit
+    if args.corpus or args.ndjson:
+        analyzer = get_shared_analyzer("rule_trees")
+        verses = iter_ayahs(args.corpus) if args.corpus else [(None, None, test_verse)]
+        records = iter_verse_records(analyzer, verses, args.mode)
+        output = args.ndjson or "-"
+        count = write_records(records, output, args.gzip or None)
+        if output != "-":
+            print(f"✅ {count} enregistrements écrits dans {output}")
+        return
+    
     print("=" * 70)
     print("🕌 ANALYSEUR TAJWID AVANCÉ - (Arbres de décision uniquement)")
     print("=" * 70)
     
     # Initialiser l'analyseur
     analyzer = SimpleTajweedAnalyzer("rule_trees")
-    
-    # Verset de test (Yusuf 12:28)
-    test_verse = "فَلَمَّا ر۪ء۪ا قَمِيصَهُۥ قُدَّ مِن دُبُرٖ قَالَ إِنَّهُۥ مِن كَيْدِkُنَّ إِنَّ كَيْدَكُنَّ عَظِيمٞۖ"
+    if args.timings:
+        analyzer.add_timing_hook(lambda verse, timings: print(
+            "⏱️ " + ", ".join(f"{stage}: {seconds * 1000:.2f} ms" for stage, seconds in timings.items())))
     
     print(f"📖 Verset analysé:")
     print(f"   {test_verse}")
     print("-" * 70)
     
     # Analyser le verset
-    result = analyzer.analyze_verse(test_verse)
+    attribute_cache = VerseAttributeCache()
+    result = analyzer.analyze_verse(test_verse, attribute_cache)
     
     # --- MODIFICATION DEMANDÉE ---
     # Afficher le résultat sous forme de JSON
@@ -395,9 +987,8 @@ def main():
     # Récupérer la liste JSON du résultat
     analysis_list = result['analysis']
     print("------------------------")
-    print(result)
     
-    # Imprimer en JSON formaté (pretty-print)
+    # Imprimer en JSON formaté (pretty-print), une seule fois
     # ensure_ascii=False est crucial pour afficher l'arabe correctement
     print(json.dumps(analysis_list, ensure_ascii=False, indent=2))
     
@@ -412,6 +1003,11 @@ def main():
     print(f"   Densité: {stats['rule_density']:.3f} règles/caractère")
     print(f"   Qualité: {stats['detection_quality']}")
     
+    cache_stats = attribute_cache.stats()
+    print(f"   Cache d'attributs: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+          f"({cache_stats['base_builds']} constructions de base, "
+          f"{cache_stats['group_builds']} groupes de caractères)")
+    
     if stats['total_rules_detected'] > 0:
         print(f"\n🎯 RÉPARTITION DES MÉTHODES:")
         for method, count in stats['method_distribution'].items():
@@ -472,25 +1068,33 @@ def create_fallback_trees():
     }
     
     for rule_name, trees in trees_to_create.items():
-        with open(f"rule_trees/{rule_name}.start.json", 'w', encoding='utf-8') as f:
-            json.dump(trees['start'], f, ensure_ascii=False, indent=2)
-        with open(f"rule_trees/{rule_name}.end.json", 'w', encoding='utf-8') as f:
-            json.dump(trees['end'], f, ensure_ascii=False, indent=2)
+        for kind in ('start', 'end'):
+            path = f"rule_trees/{rule_name}.{kind}.json"
+            # Un arbre existant n'est jamais remplacé par sa version simplifiée
+            if os.path.exists(path):
+                continue
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(trees[kind], f, ensure_ascii=False, indent=2)
     
     print("🌳 Arbres de décision de base créés dans 'rule_trees/'")
 
 if __name__ == "__main__":
-    # Vérifier si les arbres existent, sinon créer des arbres de base
-    try:
-        main()
-    except FileNotFoundError:
+    import os
+    import sys
+    
+    # Arbres de base uniquement si le dossier est absent (jamais d'écrasement d'arbres existants)
+    if not os.path.isdir("rule_trees"):
         print("❌ Dossier 'rule_trees' non trouvé")
         create_fallback_trees()
-        print("\n🔄 Redémarrage de l'analyse avec les arbres de base...")
+        print("\n🔄 Analyse avec les arbres de base...")
+    
+    try:
         main()
-    except Exception as e:
-        print(f"❌ Erreur inattendue: {e}")
-        print("🔄 Tentative de création d'arbres de base...")
-        create_fallback_trees()
-        print("\n🔄 Redémarrage de l'analyse...")
-        main()
\ No newline at end of file
+    except BrokenPipeError:
+        # Lecteur fermé (ex. '--ndjson - | head') : plus rien à écrire sur stdout
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+    except OSError as e:
+        print(f"❌ Erreur d'entrée/sortie: {e}", file=sys.stderr)
+        sys.exit(1)
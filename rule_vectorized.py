@@ -0,0 +1,284 @@
+from typing import Dict, List, Any, Iterator, Tuple
+
+import numpy as np
+
+from rule_compiler import tree_attributes, parse_context_key
+from rule_tajwid import GROUP_ATTRIBUTES, RULE_ATTRIBUTES
+from text_segmentation import DAGGER_ALIF, TATWEEL, category
+
+
+class VerseFeatureMatrix:
+    """Matrice d'attributs d'un verset : une colonne NumPy par attribut
+
+    Chaque colonne est stockée avec ``pad`` zéros de chaque côté, de sorte que
+    la colonne décalée de ``offset`` (-pad..+pad) est une simple vue : les
+    positions hors du verset valent 0, comme les attributs absents du dict
+    de l'interpréteur.
+    """
+
+    # Attributs communs à toutes les règles (hors chaînes base_char/char_group)
+    BASE_ATTRIBUTES = (
+        'position', 'start_i', 'end_i', 'is_final_codepoint_in_letter',
+        'is_final_letter_in_ayah', 'is_base',
+    ) + tuple(GROUP_ATTRIBUTES)
+
+    def __init__(self, text: str, pad: int = 3):
+        self.text = text
+        self.pad = pad
+        self.length = n = len(text)
+        self._columns: Dict[Any, np.ndarray] = {}
+
+        indices = np.arange(n)
+        codes = np.fromiter((ord(c) for c in text), dtype=np.int64, count=n)
+        self.codes = codes
+
+        mn_by_char = {c: category(c) == "Mn" for c in set(text)}
+        is_mn = np.fromiter((mn_by_char[c] for c in text), dtype=bool, count=n)
+        is_dagger = codes == ord(DAGGER_ALIF)
+        is_tatweel = codes == ord(TATWEEL)
+
+        # Début de groupe : on recule tant que la marque se rattache au précédent
+        previous_tatweel = np.zeros(n, dtype=bool)
+        previous_tatweel[1:] = is_tatweel[:-1]
+        attached = is_mn & (~is_dagger | previous_tatweel)
+        if n:
+            attached[0] = False
+        start_i = np.maximum.accumulate(np.where(attached, 0, indices)) if n else indices
+
+        # Fin de groupe : première position >= start+1 qui n'est pas une marque (ou alif suscrit)
+        breaks = np.append(~is_mn | is_dagger, True)
+        candidates = np.where(breaks, np.arange(n + 1), n)
+        next_break = np.minimum.accumulate(candidates[::-1])[::-1]
+        end_i = next_break[start_i + 1] if n else indices
+
+        self.start_i = start_i
+        self.end_i = end_i
+        self.base_codes = codes[start_i] if n else codes
+
+        # Sommes cumulées par caractère pour tester l'appartenance au groupe
+        self._prefix_counts: Dict[str, np.ndarray] = {}
+
+        self._base_columns = {
+            'position': indices,
+            'start_i': start_i,
+            'end_i': end_i,
+            'is_final_codepoint_in_letter': indices == end_i - 1,
+            'is_final_letter_in_ayah': end_i >= n,
+            'is_base': (~is_mn & ~is_tatweel) | is_dagger,
+        }
+        for name, chars in GROUP_ATTRIBUTES.items():
+            self._base_columns[name] = self.group_contains(chars)
+
+    def _prefix(self, char: str) -> np.ndarray:
+        """Nombre d'occurrences de ``char`` avant chaque indice"""
+        if char not in self._prefix_counts:
+            counts = np.zeros(self.length + 1, dtype=np.int32)
+            np.cumsum(self.codes == ord(char), out=counts[1:])
+            self._prefix_counts[char] = counts
+        return self._prefix_counts[char]
+
+    def group_contains(self, chars: str) -> np.ndarray:
+        """Vrai si le groupe de chaque position contient l'un des caractères"""
+        result = np.zeros(self.length, dtype=bool)
+        for char in chars:
+            prefix = self._prefix(char)
+            result |= prefix[self.end_i] > prefix[self.start_i]
+        return result
+
+    def base_in(self, chars: str) -> np.ndarray:
+        """Vrai si la lettre de base de chaque position fait partie des caractères"""
+        return np.isin(self.base_codes, [ord(c) for c in chars])
+
+    def _padded(self, key: Any, values: np.ndarray) -> np.ndarray:
+        column = np.zeros(self.length + 2 * self.pad, dtype=values.dtype)
+        column[self.pad:self.pad + self.length] = values
+        self._columns[key] = column
+        return column
+
+    def column(self, name: str, rule: str) -> np.ndarray:
+        """Colonne complétée (avec marges) d'un attribut tel que vu par une règle"""
+        spec = RULE_ATTRIBUTES.get(rule, {}).get(name)
+        key = spec if spec is not None else name
+
+        if key in self._columns:
+            return self._columns[key]
+
+        if spec is not None:
+            kind, chars = spec
+            if kind == 'base':
+                values = self.base_in(chars)
+            elif kind == 'group':
+                values = self.group_contains(chars)
+            else:
+                values = ~self.group_contains(chars)
+        elif name in self._base_columns:
+            values = self._base_columns[name]
+        else:
+            values = np.zeros(self.length, dtype=bool)
+
+        return self._padded(key, values)
+
+    def shifted(self, name: str, rule: str, offset: int) -> np.ndarray:
+        """Vue de la colonne décalée : valeur de la position ``p + offset`` pour chaque ``p``"""
+        column = self.column(name, rule)
+        start = self.pad + offset
+        return column[start:start + self.length]
+
+
+class VectorizedTreeEvaluator:
+    """Évaluation des arbres sur toutes les positions d'un verset à la fois"""
+
+    def __init__(self, tree_analyzer):
+        self.rule_trees = tree_analyzer.rule_trees
+        self.context_sizes = tree_analyzer.context_sizes
+        self.pad = max(max(sizes) for sizes in self.context_sizes.values())
+
+        # Résolution des clés '{offset}_{attribut}' faite une fois au chargement
+        self._plans = {
+            rule_name: {
+                key: self._resolve_key(rule_name, key)
+                for kind in ('start', 'end')
+                for key in tree_attributes(trees[kind])
+            }
+            for rule_name, trees in self.rule_trees.items()
+        }
+
+    def _resolve_key(self, rule: str, key: str):
+        """Traduire une clé comme _get_context_attributes : constante ou (attribut, offset)"""
+        parsed = parse_context_key(key)
+        if parsed is None:
+            return False
+        offset, name = parsed
+
+        lookbehind, lookahead = self.context_sizes.get(rule, (1, 1))
+        if offset < -lookbehind or offset > lookahead:
+            return False
+
+        # 'exists' n'est vrai qu'au caractère courant
+        if name == 'exists':
+            return offset == 0
+
+        # 'in_rule' dépend des segments ouverts : résolu à l'évaluation
+        if name == 'in_rule':
+            return ('in_rule', offset) if offset <= 0 else False
+
+        if name not in VerseFeatureMatrix.BASE_ATTRIBUTES and name not in RULE_ATTRIBUTES.get(rule, {}):
+            return False
+
+        return name, offset
+
+    def _evaluate(self, tree: Dict, features: VerseFeatureMatrix, rule: str, plan: Dict,
+                  in_rule: Dict[int, bool]):
+        """Évaluer un nœud ; les feuilles restent des scalaires diffusés par np.where"""
+        if 'label' in tree:
+            return bool(tree['label'])
+
+        resolved = plan[tree['attribute']]
+        threshold = tree.get('value', 0.5)
+        if not isinstance(resolved, bool) and resolved[0] == 'in_rule':
+            resolved = in_rule.get(resolved[1], False)
+        if isinstance(resolved, bool):
+            # Attribut constant : une seule branche est atteignable
+            branch = tree['gt'] if float(resolved) >= threshold else tree['lt']
+            return self._evaluate(branch, features, rule, plan, in_rule)
+
+        name, offset = resolved
+        column = features.shifted(name, rule, offset)
+        return np.where(column >= threshold,
+                        self._evaluate(tree['gt'], features, rule, plan, in_rule),
+                        self._evaluate(tree['lt'], features, rule, plan, in_rule))
+
+    def _evaluate_rule(self, features: VerseFeatureMatrix, rule: str, kind: str,
+                       in_rule: Dict[int, bool]) -> np.ndarray:
+        result = self._evaluate(self.rule_trees[rule][kind], features, rule, self._plans[rule], in_rule)
+        return np.broadcast_to(result, (features.length,))
+
+    def evaluate_verse(self, text: str, kind: str = 'start') -> Dict[str, np.ndarray]:
+        """Résultat booléen de chaque arbre pour toutes les positions du verset"""
+        features = VerseFeatureMatrix(text, self.pad)
+        return {
+            rule_name: self._evaluate_rule(features, rule_name, kind, {})
+            for rule_name in self.rule_trees
+        }
+
+    def _in_rule_offsets(self, rule: str, kind: str) -> List[int]:
+        """Offsets négatifs de 'in_rule' lus par un arbre (dépendent de l'historique)"""
+        plan = self._plans[rule]
+        return sorted({
+            plan[key][1] for key in tree_attributes(self.rule_trees[rule][kind])
+            if not isinstance(plan[key], bool) and plan[key][0] == 'in_rule' and plan[key][1] < 0
+        })
+
+    def _span_variants(self, features: VerseFeatureMatrix, rule: str, kind: str, current: bool):
+        """Une évaluation vectorisée par combinaison possible de l'historique 'in_rule'"""
+        offsets = self._in_rule_offsets(rule, kind)
+        variants = {}
+        for combination in range(2 ** len(offsets)):
+            bits = tuple(bool(combination >> i & 1) for i in range(len(offsets)))
+            in_rule = dict(zip(offsets, bits))
+            in_rule[0] = current
+            variants[bits] = self._evaluate_rule(features, rule, kind, in_rule).tolist()
+        return offsets, variants
+
+    def iter_rule_spans(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """Segments (règle, début, fin), même automate que QuranTajweedAnalyzer.iter_rule_spans"""
+        features = VerseFeatureMatrix(text, self.pad)
+        machines = {}
+        for rule_name in self.rule_trees:
+            machines[rule_name] = (
+                self._span_variants(features, rule_name, 'start', False),
+                self._span_variants(features, rule_name, 'end', True),
+            )
+
+        open_starts = {rule_name: None for rule_name in self.rule_trees}
+        histories = {rule_name: [False] * len(text) for rule_name in self.rule_trees}
+
+        for position, char in enumerate(text):
+            for rule_name, history in histories.items():
+                if char.isspace():
+                    history[position] = open_starts[rule_name] is not None
+                    continue
+
+                (start_offsets, starts), (end_offsets, ends) = machines[rule_name]
+                if open_starts[rule_name] is None:
+                    if starts[_history_bits(history, position, start_offsets)][position]:
+                        open_starts[rule_name] = position
+
+                if open_starts[rule_name] is not None:
+                    history[position] = True
+                    if ends[_history_bits(history, position, end_offsets)][position]:
+                        yield rule_name, open_starts[rule_name], position + 1
+                        open_starts[rule_name] = None
+
+    def analyze_text(self, text: str) -> List[Dict[str, Any]]:
+        """Résultats par caractère (hors espaces), au format de analyze_character_with_trees"""
+        detections = self.evaluate_verse(text, 'start')
+        rule_names = list(detections)
+
+        detected_by_position: Dict[int, List[Dict[str, str]]] = {}
+        if rule_names:
+            # Transposée : positions croissantes puis règles dans l'ordre de chargement
+            positions, rule_indices = np.nonzero(np.stack([detections[r] for r in rule_names], axis=1))
+            for position, index in zip(positions.tolist(), rule_indices.tolist()):
+                detected_by_position.setdefault(position, []).append({
+                    'rule': rule_names[index],
+                    'method': 'decision_tree',
+                })
+
+        results = []
+        for position, char in enumerate(text):
+            if char.isspace():
+                continue
+            detected_rules = detected_by_position.get(position, [])
+            results.append({
+                'position': position,
+                'character': char,
+                'rules': detected_rules,
+                'total_rules': len(detected_rules)
+            })
+        return results
+
+
+def _history_bits(history: List[bool], position: int, offsets: List[int]) -> tuple:
+    """État 'in_rule' aux offsets demandés (faux avant le début du verset)"""
+    return tuple(position + offset >= 0 and history[position + offset] for offset in offsets)
@@ -1,22 +1,53 @@
 import re
+import logging
 import unicodedata
 import json
 
+from text_segmentation import is_mark
+from result_cache import content_version
+from compact_results import InternTable, CompactCompleteResult
+
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # CLASSE DE DÉTECTION TĀJWĪD
 # ============================================================================
 
 class CompleteTajweedAnalyzer:
-    def __init__(self):
+    # Ordre de priorité des détecteurs de process_verse (détecteur, puis règle, puis pattern)
+    DETECTION_ORDER = [
+        'ikhfa', 'idgham_ghunnah', 'idgham_bila_ghunnah', 'iqlab', 'izhar',
+        'ikhfa_shafawi', 'idgham_mithlayn', 'izhar_shafawi',
+        'lam_shamsiyya', 'lam_qamariyya',
+        'madd_muttasil', 'madd_munfasil', 'madd_lazim', 'madd_arid', 'madd_silah',
+        'qalqala_kubra', 'qalqala_sughra',
+        'ghunnah',
+        'sakt',
+        'tafkhim', 'tarqiq'
+    ]
+
+    def __init__(self, combined=True, normalization_cache=None, result_cache=None):
         self.solar_letters = "تثدذرزسشصضطظلن"
         self.rules_patterns = self._create_patterns()
+        # Mode combiné : une seule regex, un seul match par position
+        self.combined = combined
+        self.scanner = self._compile_scanner() if combined else None
+        # Cache de normalisation optionnel (BoundedLRUCache, partageable)
+        self.normalization_cache = normalization_cache
+        # Cache persistant des résultats (VerseResultCache), invalidé si les patterns changent
+        self.result_cache = result_cache
+        self.cache_version = content_version(self.rules_patterns, self.DETECTION_ORDER)
+        # Règles internées des résultats compacts
+        self.result_table = InternTable()
 
     # -------------------- Normalisation & utilitaires -----------------------
     def _normalize(self, text):
-        return unicodedata.normalize("NFC", text)
+        if self.normalization_cache is None:
+            return unicodedata.normalize("NFC", text)
+        return self.normalization_cache.get_or_compute(('nfc', text), lambda: unicodedata.normalize("NFC", text))
 
     def is_letter(self, char):
-        return not unicodedata.category(char).startswith('M')
+        return not is_mark(char)
 
     # -------------------- Définition des patterns --------------------------
     def _create_patterns(self):
@@ -59,6 +90,14 @@ class CompleteTajweedAnalyzer:
             'tarqiq': [r'[ظطضصغخ][ِ]']
         }
 
+    def _compile_scanner(self):
+        """Tous les patterns en une alternation, un groupe nommé par règle, dans l'ordre de priorité"""
+        alternatives = [
+            f"(?P<{rule}>" + "|".join(f"(?:{pat})" for pat in self.rules_patterns[rule]) + ")"
+            for rule in self.DETECTION_ORDER
+        ]
+        return re.compile("|".join(alternatives))
+
     def get_category(self, rule):
         categories = {
             'ikhfa': 'nun_tanween', 'idgham_ghunnah': 'nun_tanween',
@@ -136,33 +175,44 @@ class CompleteTajweedAnalyzer:
         return None
 
     # -------------------- Pipeline complet --------------------------
+    def _detect_rule(self, verse, i):
+        """Détecteurs individuels appliqués un par un (mode non combiné)"""
+        letter = verse[i]
+        next_letter = verse[i+1] if i+1 < len(verse) else ""
+        rule_candidate = None
+
+        # Appliquer tous les détecteurs dans l'ordre correct
+        try:
+            rule_candidate = self.detect_nun_sakinah(verse, i)
+            if not rule_candidate:
+                rule_candidate = self.detect_meem_sakinah(verse, i)
+            if not rule_candidate:
+                rule_candidate = self.detect_lam_sakinah(letter, next_letter)
+            if not rule_candidate:
+                rule_candidate = self.detect_madd(verse, i)
+            if not rule_candidate:
+                rule_candidate = self.detect_qalqala(letter, next_letter)
+            if not rule_candidate:
+                rule_candidate = self.detect_ghunnah(letter, next_letter)
+            if not rule_candidate:
+                rule_candidate = self.detect_sakt(letter)
+            if not rule_candidate:
+                rule_candidate = self.detect_quality(letter, next_letter)
+        except Exception as e:
+            logger.warning("Erreur à la position %d: %s", i, e)
+        return rule_candidate
+
     def process_verse(self, verse):
         verse = self._normalize(verse)
         result = []
 
         for i, letter in enumerate(verse):
-            next_letter = verse[i+1] if i+1 < len(verse) else ""
-            rule_candidate = None
-
-            # Appliquer tous les détecteurs dans l'ordre correct
-            try:
-                rule_candidate = self.detect_nun_sakinah(verse, i)
-                if not rule_candidate:
-                    rule_candidate = self.detect_meem_sakinah(verse, i)
-                if not rule_candidate:
-                    rule_candidate = self.detect_lam_sakinah(letter, next_letter)
-                if not rule_candidate:
-                    rule_candidate = self.detect_madd(verse, i)
-                if not rule_candidate:
-                    rule_candidate = self.detect_qalqala(letter, next_letter)
-                if not rule_candidate:
-                    rule_candidate = self.detect_ghunnah(letter, next_letter)
-                if not rule_candidate:
-                    rule_candidate = self.detect_sakt(letter)
-                if not rule_candidate:
-                    rule_candidate = self.detect_quality(letter, next_letter)
-            except Exception as e:
-                print(f"Erreur à la position {i}: {e}")
+            if self.scanner is not None:
+                # endpos = i+2 : équivalent des tranches de 2 caractères des détecteurs
+                match = self.scanner.match(verse, i, i + 2)
+                rule_candidate = match.lastgroup if match else None
+            else:
+                rule_candidate = self._detect_rule(verse, i)
 
             result.append({
                 "position": i,
@@ -176,7 +226,27 @@ class CompleteTajweedAnalyzer:
 
     # -------------------- Statistiques --------------------------
     def summarize(self, verse):
-        rules = self.process_verse(verse)
+        if self.result_cache is not None:
+            key = self.result_cache.key(type(self).__name__, self.cache_version, self._normalize(verse))
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                # Seuls le texte d'origine et la densité (sa longueur) dépendent de l'appel
+                cached["verse"] = verse
+                cached["summary"]["rule_density"] = cached["summary"]["total_rules"] / len(verse)
+                return cached
+            result = self._summarize(verse)
+            self.result_cache.put(key, result)
+            return result
+        return self._summarize(verse)
+
+    def _summarize(self, verse):
+        return self._summary_from_rules(verse, self.process_verse(verse))
+
+    def summarize_compact(self, verse):
+        """Même analyse que summarize, stockée en tableaux (CompactCompleteResult)"""
+        return CompactCompleteResult.from_result(self, self.result_table, self.summarize(verse))
+
+    def _summary_from_rules(self, verse, rules):
         rule_counts, category_counts = {}, {}
         for r in rules:
             if r["rule"]:
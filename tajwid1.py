@@ -1,15 +1,34 @@
 import re
-import unicodedata
 import json
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional
+
+from text_normalizer import normalize
+from bounded_cache import BoundedLRUCache
+from result_cache import VerseResultCache, content_version, code_fingerprint
+from compact_results import InternTable, CompactEnhancedResult
 
 class EnhancedTajweedAnalyzer:
     """Analyseur de Tajwid amélioré avec règles étendues"""
     
-    def __init__(self):
+    def __init__(self, normalization_cache: Optional[BoundedLRUCache] = None,
+                 result_cache: Optional[VerseResultCache] = None):
         self.character_categories = self._initialize_character_categories()
         self.rules = self._initialize_enhanced_rules()
-        self.normalization_cache = {}
+        self.compiled_rules = self._compile_rules()
+        # Cache borné (LRU) : peut être partagé avec les autres analyseurs
+        self.normalization_cache = normalization_cache if normalization_cache is not None else BoundedLRUCache()
+        # Cache persistant des résultats, invalidé si les patterns, les
+        # explications ou la logique des règles Lam / cas spéciaux changent
+        self.result_cache = result_cache
+        self.cache_version = content_version(
+            self.rules, self.character_categories,
+            code_fingerprint(EnhancedTajweedAnalyzer.get_rule_explanation,
+                             EnhancedTajweedAnalyzer._check_lam_rules,
+                             EnhancedTajweedAnalyzer._check_special_cases,
+                             EnhancedTajweedAnalyzer.analyze_character)
+        )
+        # (règle, explication) internées une fois pour tous les résultats compacts
+        self.result_table = InternTable()
     
     def _initialize_character_categories(self) -> Dict[str, str]:
         """Catégories de caractères étendues"""
@@ -135,25 +154,17 @@ class EnhancedTajweedAnalyzer:
             ]
         }
     
+    def _compile_rules(self) -> Dict[str, re.Pattern]:
+        """Une regex précompilée par règle (alternation de ses patterns)"""
+        return {
+            rule_name: re.compile("|".join(f"(?:{pattern})" for pattern in pattern_list))
+            for rule_name, pattern_list in self.rules.items()
+        }
+    
     def _normalize(self, text: str) -> str:
         """Normalisation améliorée"""
-        if text in self.normalization_cache:
-            return self.normalization_cache[text]
-        
-        # Remplacer les caractères spéciaux du Coran
-        replacements = {
-            '۪': '', 'ۥ': '', 'ۖ': '', 'ۗ': '', 'ۘ': '', 'ۙ': '', 'ۚ': '', 'ۛ': '', 'ۜ': '',
-            'ٞ': '', 'ٰ': 'ا', 'ۦ': '', 'ۭ': '', '۫': '', '۬': '', '۩': '', 'ۨ': '', 'ۧ': '',
-            '۠': '', 'ۡ': 'ْ', 'ۢ': '', 'ۣ': '', 'ۤ': '', 'ۥ': '', 'ۦ': '', 'ۧ': '', 'ۨ': '',
-            '۩': '', '۪': '', '۫': '', '۬': '', 'ۭ': '', 'ۮ': '', 'ۯ': ''
-        }
-        
-        normalized = unicodedata.normalize("NFC", text)
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-        
-        self.normalization_cache[text] = normalized
-        return normalized
+        # NFC et caractères spéciaux du Coran en un seul passage
+        return self.normalization_cache.get_or_compute(('quran', text), lambda: normalize(text))
     
     def get_rule_explanation(self, rule_name: str) -> str:
         """Explications étendues des règles"""
@@ -242,23 +253,18 @@ class EnhancedTajweedAnalyzer:
         used_rules = set()
         
         # Vérifier toutes les règles standards
-        for rule_name, pattern_list in self.rules.items():
+        for rule_name, pattern in self.compiled_rules.items():
             if rule_name in used_rules:
                 continue
-                
-            for pattern in pattern_list:
-                # Vérifier à partir de la position actuelle
-                text_to_check = text[position:]
-                match = re.search(pattern, text_to_check)
-                
-                if match and match.start() == 0:
-                    detected_rules.append({
-                        'rule': rule_name,
-                        'explanation': self.get_rule_explanation(rule_name),
-                        'context': context
-                    })
-                    used_rules.add(rule_name)
-                    break
+            
+            # Ancré à la position actuelle : ni copie ni recherche dans le reste du verset
+            if pattern.match(text, position):
+                detected_rules.append({
+                    'rule': rule_name,
+                    'explanation': self.get_rule_explanation(rule_name),
+                    'context': context
+                })
+                used_rules.add(rule_name)
         
         # Vérifier les règles spéciales de Lam
         lam_rules = self._check_lam_rules(text, position)
@@ -285,6 +291,13 @@ class EnhancedTajweedAnalyzer:
     def analyze_verse(self, verse: str) -> Dict:
         """Analyse de verset améliorée"""
         verse = self._normalize(verse)
+        
+        if self.result_cache is not None:
+            result_key = self.result_cache.key(type(self).__name__, self.cache_version, verse)
+            cached = self.result_cache.get(result_key)
+            if cached is not None:
+                return cached
+        
         analysis_results = []
         
         i = 0
@@ -297,12 +310,19 @@ class EnhancedTajweedAnalyzer:
             analysis_results.append(char_analysis)
             i += 1
         
-        return {
+        result = {
             'verse': verse,
             'analysis': analysis_results,
             'statistics': self._generate_statistics(analysis_results),
             'summary': self._generate_summary(analysis_results)
         }
+        if self.result_cache is not None:
+            self.result_cache.put(result_key, result)
+        return result
+    
+    def analyze_verse_compact(self, verse: str) -> CompactEnhancedResult:
+        """Même analyse que analyze_verse, stockée en tableaux (to_dict() pour la forme habituelle)"""
+        return CompactEnhancedResult.from_result(self, self.result_table, self.analyze_verse(verse))
     
     def _generate_statistics(self, analysis_results: List[Dict]) -> Dict:
         """Génération de statistiques améliorée"""
@@ -0,0 +1,48 @@
+import json
+import sys
+
+import pytest
+
+import benchmark_tajwid
+
+
+def _metrics(characters_per_second: float) -> dict:
+    return {
+        'ayahs': 10,
+        'characters': 1000,
+        'construction_seconds': 0.01,
+        'total_seconds': 1000 / characters_per_second,
+        'characters_per_second': characters_per_second,
+        'latency_p50_ms': 1.0,
+        'latency_p95_ms': 2.0,
+        'latency_p99_ms': 3.0,
+        'peak_rss_mb': 50.0,
+    }
+
+
+def _run_main(monkeypatch, characters_per_second: float, *argv: str):
+    monkeypatch.setattr(benchmark_tajwid, 'run_benchmarks',
+                        lambda *args, **kwargs: {'quran_trees/short': _metrics(characters_per_second)})
+    monkeypatch.setattr(sys, 'argv', ['benchmark_tajwid.py', *argv])
+    benchmark_tajwid.main()
+
+
+def test_slower_run_against_same_file_fails(tmp_path, monkeypatch):
+    """--output et --baseline sur le même fichier : la référence est lue avant d'être écrasée"""
+    results = tmp_path / "benchmark_results.json"
+    results.write_text(json.dumps({'quran_trees/short': _metrics(100000.0)}), encoding='utf-8')
+
+    with pytest.raises(SystemExit) as exit_info:
+        _run_main(monkeypatch, 1000.0, "--output", str(results), "--baseline", str(results))
+
+    assert exit_info.value.code == 1
+    # Les nouveaux résultats sont quand même sauvegardés
+    saved = json.loads(results.read_text(encoding='utf-8'))
+    assert saved['quran_trees/short']['characters_per_second'] == 1000.0
+
+
+def test_same_speed_passes(tmp_path, monkeypatch):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({'quran_trees/short': _metrics(1000.0)}), encoding='utf-8')
+
+    _run_main(monkeypatch, 1000.0, "--output", str(tmp_path / "out.json"), "--baseline", str(baseline))
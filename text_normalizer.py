@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from typing import List, Tuple
+
+# Caractères spéciaux du Coran : supprimés ou remplacés (comme dans cpfair/quran-tajweed)
+QURAN_REPLACEMENTS = {
+    '۪': '', 'ۥ': '', 'ۖ': '', 'ۗ': '', 'ۘ': '', 'ۙ': '', 'ۚ': '', 'ۛ': '', 'ۜ': '',
+    'ٞ': '', 'ٰ': 'ا', 'ۦ': '', 'ۭ': '', '۫': '', '۬': '', '۩': '', 'ۨ': '', 'ۧ': '',
+    '۠': '', 'ۡ': 'ْ', 'ۢ': '', 'ۣ': '', 'ۤ': '', 'ۮ': '', 'ۯ': ''
+}
+
+# Un seul passage avec re.sub : plus rapide que str.translate sur du texte
+# non latin (translate consulte une table pour chaque caractère)
+REPLACEMENT_PATTERN = re.compile("[" + "".join(QURAN_REPLACEMENTS) + "]")
+
+
+def _replace(match: re.Match) -> str:
+    return QURAN_REPLACEMENTS[match.group()]
+
+
+def normalize(text: str) -> str:
+    """NFC puis remplacements en un seul passage"""
+    return REPLACEMENT_PATTERN.sub(_replace, unicodedata.normalize("NFC", text))
+
+
+def _segments(text: str) -> List[Tuple[int, int]]:
+    """Découper en segments (caractère de base + marques qui le suivent)"""
+    bounds = [i for i, char in enumerate(text) if i == 0 or unicodedata.combining(char) == 0]
+    return list(zip(bounds, bounds[1:] + [len(text)]))
+
+
+def _nfc_with_origins(text: str) -> Tuple[str, List[int]]:
+    """NFC du texte et, pour chaque caractère produit, son indice dans le texte d'origine
+
+    NFC réordonne et compose les marques à l'intérieur d'un segment : chaque
+    caractère produit est retrouvé dans son segment d'origine, un caractère
+    composé (ex. alif + madda -> آ) étant rattaché au début du segment.
+    """
+    parts, origins = [], []
+    for start, end in _segments(text):
+        segment = text[start:end]
+        composed = unicodedata.normalize("NFC", segment)
+        parts.append(composed)
+        if composed == segment:
+            origins.extend(range(start, end))
+            continue
+
+        used = set()
+        for char in composed:
+            origin = start
+            for i in range(start, end):
+                if text[i] == char and i not in used:
+                    origin = i
+                    used.add(i)
+                    break
+            origins.append(origin)
+
+    composed_text = "".join(parts)
+    if composed_text != unicodedata.normalize("NFC", text):
+        # Composition entre segments (hors écriture arabe) : correspondance grossière
+        composed_text = unicodedata.normalize("NFC", text)
+        origins = [min(i, len(text) - 1) for i in range(len(composed_text))]
+    return composed_text, origins
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """Texte normalisé et indice d'origine de chacun de ses caractères"""
+    if unicodedata.is_normalized("NFC", text):
+        composed, origins = text, range(len(text))
+    else:
+        composed, origins = _nfc_with_origins(text)
+
+    characters, offsets = [], []
+    for char, origin in zip(composed, origins):
+        replacement = QURAN_REPLACEMENTS.get(char, char)
+        characters.append(replacement)
+        offsets.extend([origin] * len(replacement))
+    return "".join(characters), offsets
+
+
+def to_original_span(offsets: List[int], start: int, end: int) -> Tuple[int, int]:
+    """Convertir un segment [start, end) du texte normalisé en segment du texte d'origine"""
+    if start >= end:
+        origin = offsets[start] if start < len(offsets) else (offsets[-1] + 1 if offsets else 0)
+        return origin, origin
+    return offsets[start], max(offsets[start:end]) + 1
@@ -0,0 +1,68 @@
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+DAGGER_ALIF = "ٰ"
+TATWEEL = "ـ"
+
+# Catégories Unicode du bloc arabe (U+0600-U+06FF), précalculées une fois
+ARABIC_BLOCK_START = 0x0600
+ARABIC_BLOCK_END = 0x0700
+ARABIC_CATEGORIES = tuple(unicodedata.category(chr(code)) for code in range(ARABIC_BLOCK_START, ARABIC_BLOCK_END))
+
+
+def category(char: str) -> str:
+    """Catégorie Unicode (table pour le bloc arabe, unicodedata sinon)"""
+    code = ord(char)
+    if ARABIC_BLOCK_START <= code < ARABIC_BLOCK_END:
+        return ARABIC_CATEGORIES[code - ARABIC_BLOCK_START]
+    return unicodedata.category(char)
+
+
+def is_mark(char: str) -> bool:
+    """Vrai pour les marques combinantes (Mn, Mc, Me)"""
+    return category(char)[0] == 'M'
+
+
+class VerseSegmentation:
+    """Groupes de caractères (lettre de base + diacritiques) d'un verset, en un seul passage
+
+    ``starts[p]`` et ``ends[p]`` délimitent le groupe de la position ``p``,
+    exactement comme le balayage arrière/avant de _get_character_group.
+    """
+
+    __slots__ = ('text', 'categories', 'starts', 'ends')
+
+    def __init__(self, text: str):
+        self.text = text
+        n = len(text)
+        self.categories: List[str] = [category(char) for char in text]
+        is_mn = [cat == "Mn" for cat in self.categories]
+
+        # Début : une marque se rattache au précédent (alif suscrit seulement après tatweel)
+        starts = list(range(n))
+        for p in range(1, n):
+            if is_mn[p] and (text[p] != DAGGER_ALIF or text[p - 1] == TATWEEL):
+                starts[p] = starts[p - 1]
+
+        # Fin : première position après le début qui n'est pas une marque (ou est un alif suscrit)
+        next_break = [n] * (n + 1)
+        for p in range(n - 1, -1, -1):
+            next_break[p] = p if not is_mn[p] or text[p] == DAGGER_ALIF else next_break[p + 1]
+
+        self.starts = starts
+        self.ends = [next_break[start + 1] for start in starts]
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def group(self, position: int) -> Tuple[int, int, str]:
+        """(début, fin, texte du groupe) de la position"""
+        start_i, end_i = self.starts[position], self.ends[position]
+        return start_i, end_i, self.text[start_i:end_i]
+
+
+@lru_cache(maxsize=256)
+def segment_verse(text: str) -> VerseSegmentation:
+    """Segmentation d'un verset, mémorisée pour les derniers versets vus"""
+    return VerseSegmentation(text)
@@ -0,0 +1,160 @@
+import os
+import json
+from bisect import bisect_right
+from typing import Dict, List, Any
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+# Version du format (à incrémenter si la disposition des fichiers change)
+STORE_VERSION = 1
+
+# Disposition d'un store :
+#   store.json                   version et liste des lots (nom, nb d'exemples)
+#   shard-00000/input_values.f32 float32 à plat, exemples mis bout à bout
+#   shard-00000/labels.i32       int32 à plat
+#   shard-00000/offsets.npy      int64[nb exemples + 1, 2] : début (audio, labels) de chaque exemple
+AUDIO_FILE = "input_values.f32"
+LABELS_FILE = "labels.i32"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "store.json"
+
+
+class TrainingStoreWriter:
+    """Écriture des exemples {"input_values", "labels"} en fichiers plats, au fil de l'eau
+
+    Un nouveau lot est commencé dès que le lot courant dépasse
+    ``max_shard_bytes`` ; seuls les offsets restent en mémoire.
+    """
+
+    def __init__(self, directory: str, max_shard_bytes: int = 1 << 30):
+        self.directory = directory
+        self.max_shard_bytes = max_shard_bytes
+        self.shards: List[Dict[str, Any]] = []
+        self.count = 0
+        self._audio = None
+        self._labels = None
+        self._offsets: List[tuple] = []
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_shard(self):
+        name = f"shard-{len(self.shards):05d}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        self._audio = open(os.path.join(path, AUDIO_FILE), 'wb')
+        self._labels = open(os.path.join(path, LABELS_FILE), 'wb')
+        self._offsets = [(0, 0)]
+        self.shards.append({'name': name, 'examples': 0})
+
+    def _close_shard(self):
+        if self._audio is None:
+            return
+        self._audio.close()
+        self._labels.close()
+        path = os.path.join(self.directory, self.shards[-1]['name'])
+        np.save(os.path.join(path, OFFSETS_FILE), np.asarray(self._offsets, dtype=np.int64))
+        self._audio = self._labels = None
+
+    def write(self, record: Dict[str, Any]):
+        if self._audio is None:
+            self._open_shard()
+
+        input_values = np.ascontiguousarray(np.asarray(record["input_values"], dtype=np.float32).reshape(-1))
+        labels = np.ascontiguousarray(np.asarray(record["labels"], dtype=np.int32).reshape(-1))
+        self._audio.write(input_values.tobytes())
+        self._labels.write(labels.tobytes())
+
+        audio_end, labels_end = self._offsets[-1]
+        self._offsets.append((audio_end + len(input_values), labels_end + len(labels)))
+        self.shards[-1]['examples'] += 1
+        self.count += 1
+
+        if self._offsets[-1][0] * 4 >= self.max_shard_bytes:
+            self._close_shard()
+
+    def close(self):
+        """Terminer le lot courant puis écrire store.json (le store n'est lisible qu'après)"""
+        self._close_shard()
+        with open(os.path.join(self.directory, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'examples': self.count, 'shards': self.shards}, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _map(path: str, dtype) -> np.ndarray:
+    """Mapping copie-sur-écriture d'un fichier plat (tableau vide si le fichier l'est)"""
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='c')
+
+
+class TrainingStore(Dataset):
+    """Accès aléatoire sans copie aux exemples d'un store (Dataset PyTorch)
+
+    L'ouverture ne lit que store.json et mappe les fichiers : coût constant,
+    quelle que soit la taille du store. Les workers d'un DataLoader
+    partagent les pages du cache système au lieu de garder chacun une copie.
+    Les tenseurs rendus sont des vues sur le mapping (copie-sur-écriture :
+    les modifier ne touche pas au fichier). Avec des workers lancés par
+    spawn, seul le chemin est sérialisé : chaque worker remappe les fichiers.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Version de store non supportée: {meta.get('version')}")
+
+        self.shards = []
+        self.starts = []
+        total = 0
+        for shard in meta['shards']:
+            path = os.path.join(directory, shard['name'])
+            self.shards.append((
+                _map(os.path.join(path, AUDIO_FILE), np.float32),
+                _map(os.path.join(path, LABELS_FILE), np.int32),
+                np.load(os.path.join(path, OFFSETS_FILE), mmap_mode='r'),
+            ))
+            self.starts.append(total)
+            total += shard['examples']
+        self.count = total
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Les memmaps seraient sinon copiés en entier dans le pickle
+        return {'directory': self.directory}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['directory'])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _locate(self, index: int) -> tuple:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        shard = bisect_right(self.starts, index) - 1
+        return shard, index - self.starts[shard]
+
+    def __getitem__(self, index: int) -> Dict[str, torch.Tensor]:
+        shard, local = self._locate(index)
+        audio, labels, offsets = self.shards[shard]
+        audio_start, labels_start = offsets[local]
+        audio_end, labels_end = offsets[local + 1]
+        return {
+            "input_values": torch.from_numpy(audio[audio_start:audio_end]),
+            "labels": torch.from_numpy(labels[labels_start:labels_end]),
+        }
+
+    def input_lengths(self) -> np.ndarray:
+        """Nombre d'échantillons audio de chaque exemple (lu dans les offsets seulement)"""
+        if not self.shards:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.diff(offsets[:, 0]) for _, _, offsets in self.shards])